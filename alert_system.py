@@ -4,26 +4,107 @@ Monitors price changes and sends alerts via terminal, email, or webhook
 """
 
 import smtplib
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import config
+from security_config import SecurityConfig
 
 # Set up logging
 logging.basicConfig(level=getattr(logging, config.LOG_LEVEL), format=config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+# Terminal/webhook alert message template
+_ALERT_TMPL = (
+    "🚨 PRICE ALERT 🚨\n"
+    "Asset: %s\n"
+    "Current Price: $%s\n"
+    "24h Change: %+.2f%% %s\n"
+    "Threshold: ±%s%%\n"
+    "Time: %s"
+)
+
+# HTML email alert body template
+_EMAIL_HTML_TMPL = """\
+<html>
+<body>
+    <h2>🚨 Price Alert 🚨</h2>
+    <table style="border-collapse: collapse; width: 100%;">
+        <tr>
+            <td style="padding: 8px; border: 1px solid #ddd;"><strong>Asset:</strong></td>
+            <td style="padding: 8px; border: 1px solid #ddd;">{symbol_upper}</td>
+        </tr>
+        <tr>
+            <td style="padding: 8px; border: 1px solid #ddd;"><strong>Current Price:</strong></td>
+            <td style="padding: 8px; border: 1px solid #ddd;">${price}</td>
+        </tr>
+        <tr>
+            <td style="padding: 8px; border: 1px solid #ddd;"><strong>24h Change:</strong></td>
+            <td style="padding: 8px; border: 1px solid #ddd; color: {change_color};">
+                {change}%
+            </td>
+        </tr>
+        <tr>
+            <td style="padding: 8px; border: 1px solid #ddd;"><strong>Threshold:</strong></td>
+            <td style="padding: 8px; border: 1px solid #ddd;">±{threshold}%</td>
+        </tr>
+        <tr>
+            <td style="padding: 8px; border: 1px solid #ddd;"><strong>Time:</strong></td>
+            <td style="padding: 8px; border: 1px solid #ddd;">{ts}</td>
+        </tr>
+    </table>
+</body>
+</html>
+"""
+
 class AlertSystem:
     def __init__(self):
         self.threshold = config.ALERT_THRESHOLD
         self.cooldown = config.ALERT_COOLDOWN
-        self.last_alerts = {}  # Track last alert time for each asset
+        # Monotonic time of last alert for each asset, oldest first
+        self.last_alerts: Dict[str, float] = OrderedDict()
+        # Guards last_alerts: scheduler jobs update it while dashboard threads read it
+        self._alerts_lock = threading.Lock()
+        self._max_alert_entries = config.MAX_ALERT_ENTRIES
         self.email_enabled = config.EMAIL_ENABLED
         self.webhook_enabled = config.WEBHOOK_ENABLED
+        self._http = self._create_http_session()
+        self._smtp = None  # Cached authenticated SMTP connection
+        self._smtp_sends = 0  # Messages sent on the current SMTP connection
+        self._dispatcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix='alert-dispatch')
+        self._queue = queue.Queue(maxsize=config.ALERT_QUEUE_SIZE)  # Alerts awaiting delivery
+        self._worker = threading.Thread(target=self._drain, name='alert-worker', daemon=True)
+        self._worker.start()
+        
+    def _create_http_session(self) -> requests.Session:
+        """Create a pooled HTTP session reused for all webhook calls"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                read=0,  # A read error means the webhook may have received the POST; never resend it
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=None  # Also retry POST requests on connect errors and these statuses
+            )
+        )
+        session.mount('https://', adapter)
+        session.headers.update({'Content-Type': 'application/json'})
+        return session
         
     def check_price_alerts(self, prices: Dict) -> List[Dict]:
         """
@@ -37,62 +118,80 @@ class AlertSystem:
         """
         alerts = []
         current_time = datetime.now()
+        now_mono = time.monotonic()
         
         if not prices:
             return alerts
         
+        # Validate price data
+        valid_prices = []
         for symbol, price_data in prices.items():
-            # Validate price data
             if not self._validate_price_data(symbol, price_data):
                 logger.warning(f"Invalid price data for {symbol}, skipping alert check")
                 continue
+            valid_prices.append((symbol, price_data))
+        
+        if not valid_prices:
+            return alerts
+        
+        # Check which changes exceed the threshold in one vectorized pass
+        changes = np.fromiter(
+            (price_data['change_24h'] for _, price_data in valid_prices),
+            dtype=np.float64,
+            count=len(valid_prices)
+        )
+        triggered = np.flatnonzero(np.abs(changes) >= self.threshold)
+        
+        # Cooldown check and update happen under one lock so concurrent crypto and
+        # stock jobs can neither double-alert nor mutate the dict mid-iteration
+        with self._alerts_lock:
+            for index in triggered:
+                symbol, price_data = valid_prices[index]
                 
-            change_24h = price_data.get('change_24h', 0)
-            price = price_data.get('price', 0)
-            
-            # Check if change exceeds threshold
-            if abs(change_24h) >= self.threshold:
                 # Check cooldown
-                if self._can_send_alert(symbol, current_time):
-                    alert = {
-                        'symbol': symbol,
-                        'price': price,
-                        'change_24h': change_24h,
-                        'threshold': self.threshold,
-                        'timestamp': current_time,
-                        'type': price_data.get('type', 'unknown'),
-                        'message': self._format_alert_message(symbol, price, change_24h)
-                    }
-                    alerts.append(alert)
-                    
-                    # Update last alert time
-                    self.last_alerts[symbol] = current_time
-                    
+                if not self._can_send_alert(symbol, now_mono):
+                    continue
+                
+                change_24h = price_data['change_24h']
+                price = price_data['price']
+                alert = {
+                    'symbol': symbol,
+                    'price': price,
+                    'change_24h': change_24h,
+                    'threshold': self.threshold,
+                    'timestamp': current_time,
+                    'type': price_data.get('type', 'unknown'),
+                    'message': None  # Formatted on first use by _get_alert_message
+                }
+                alerts.append(alert)
+                
+                # Update last alert time, evicting the oldest entries beyond the cap
+                self.last_alerts[symbol] = now_mono
+                self.last_alerts.move_to_end(symbol)
+                while len(self.last_alerts) > self._max_alert_entries:
+                    self.last_alerts.popitem(last=False)
+                        
         return alerts
     
     def _validate_price_data(self, symbol: str, price_data: Dict) -> bool:
         """Validate price data before processing alerts"""
-        from security_config import SecurityConfig
         return SecurityConfig.validate_price_data(symbol, price_data)
     
-    def _can_send_alert(self, symbol: str, current_time: datetime) -> bool:
+    def _can_send_alert(self, symbol: str, now_mono: float) -> bool:
         """
         Check if enough time has passed since the last alert for this symbol
         
         Args:
             symbol: Asset symbol
-            current_time: Current timestamp
+            now_mono: Current time.monotonic() value
             
         Returns:
             True if alert can be sent
         """
-        if symbol not in self.last_alerts:
-            return True
-            
-        time_since_last = current_time - self.last_alerts[symbol]
-        return time_since_last.total_seconds() >= self.cooldown
+        return now_mono - self.last_alerts.get(symbol, float('-inf')) >= self.cooldown
     
-    def _format_alert_message(self, symbol: str, price: float, change_24h: float) -> str:
+    def _format_alert_message(self, symbol: str, price: float, change_24h: float,
+                              current_time: datetime) -> str:
         """
         Format alert message
         
@@ -100,23 +199,37 @@ class AlertSystem:
             symbol: Asset symbol
             price: Current price
             change_24h: 24h price change percentage
+            current_time: Time the alert was triggered
             
         Returns:
             Formatted alert message
         """
         direction = "📈" if change_24h > 0 else "📉"
-        change_text = "increased" if change_24h > 0 else "decreased"
-        
-        message = (
-            f"🚨 PRICE ALERT 🚨\n"
-            f"Asset: {symbol.upper()}\n"
-            f"Current Price: ${price:,.2f}\n"
-            f"24h Change: {change_24h:+.2f}% {direction}\n"
-            f"Threshold: ±{self.threshold}%\n"
-            f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        
+        return _ALERT_TMPL % (
+            symbol.upper(),
+            format(price, ',.2f'),
+            change_24h,
+            direction,
+            self.threshold,
+            current_time.strftime('%Y-%m-%d %H:%M:%S')
         )
+    
+    def _get_alert_message(self, alert: Dict) -> str:
+        """
+        Return the alert's message, formatting it on first use
         
-        return message
+        Args:
+            alert: Alert data dictionary
+            
+        Returns:
+            Formatted alert message
+        """
+        if alert.get('message') is None:
+            alert['message'] = self._format_alert_message(
+                alert['symbol'], alert['price'], alert['change_24h'], alert['timestamp']
+            )
+        return alert['message']
     
     def send_terminal_alert(self, alert: Dict):
         """
@@ -127,7 +240,7 @@ class AlertSystem:
         """
         try:
             print("\n" + "="*50)
-            print(alert['message'])
+            print(self._get_alert_message(alert))
             print("="*50 + "\n")
             logger.info(f"Terminal alert sent for {alert['symbol']}")
             
@@ -157,60 +270,82 @@ class AlertSystem:
             msg['Subject'] = f"Price Alert: {alert['symbol'].upper()}"
             
             # Create HTML body
-            html_body = f"""
-            <html>
-            <body>
-                <h2>🚨 Price Alert 🚨</h2>
-                <table style="border-collapse: collapse; width: 100%;">
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;"><strong>Asset:</strong></td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{alert['symbol'].upper()}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;"><strong>Current Price:</strong></td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">${alert['price']:,.2f}</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;"><strong>24h Change:</strong></td>
-                        <td style="padding: 8px; border: 1px solid #ddd; color: {'green' if alert['change_24h'] > 0 else 'red'};">
-                            {alert['change_24h']:+.2f}%
-                        </td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;"><strong>Threshold:</strong></td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">±{alert['threshold']}%</td>
-                    </tr>
-                    <tr>
-                        <td style="padding: 8px; border: 1px solid #ddd;"><strong>Time:</strong></td>
-                        <td style="padding: 8px; border: 1px solid #ddd;">{alert['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}</td>
-                    </tr>
-                </table>
-            </body>
-            </html>
-            """
+            html_body = _EMAIL_HTML_TMPL.format(
+                symbol_upper=alert['symbol'].upper(),
+                price=format(alert['price'], ',.2f'),
+                change=format(alert['change_24h'], '+.2f'),
+                change_color='green' if alert['change_24h'] > 0 else 'red',
+                threshold=alert['threshold'],
+                ts=alert['timestamp'].strftime('%Y-%m-%d %H:%M:%S')
+            )
             
             msg.attach(MIMEText(html_body, 'html'))
             
-            # Send email
-            server = smtplib.SMTP(config.EMAIL_SMTP_SERVER, config.EMAIL_SMTP_PORT)
-            server.starttls()
-            
-            # Get password from environment variable
-            email_password = os.getenv('EMAIL_PASSWORD', config.EMAIL_PASSWORD)
-            if not email_password:
-                logger.error("Email password not found in environment variables")
-                return
-                
-            server.login(config.EMAIL_FROM, email_password)
-            
-            text = server.send_message(msg)
-            server.quit()
+            # Send email, reconnecting once if the cached connection went stale
+            try:
+                self._get_smtp().send_message(msg)
+            except (smtplib.SMTPException, OSError):
+                self._reset_smtp()
+                self._get_smtp().send_message(msg)
+            self._smtp_sends += 1
             
             logger.info(f"Email alert sent for {alert['symbol']}")
             
         except Exception as e:
             logger.error(f"Error sending email alert: {e}")
     
+    def _get_smtp(self) -> smtplib.SMTP:
+        """
+        Return a live, authenticated SMTP connection, creating one if needed
+        
+        Returns:
+            Connected SMTP client
+        """
+        if self._smtp is not None and self._smtp_sends >= config.EMAIL_MAX_SENDS_PER_CONNECTION:
+            self._reset_smtp()
+        
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._reset_smtp()
+        
+        # Get password from environment variable
+        email_password = os.getenv('EMAIL_PASSWORD', config.EMAIL_PASSWORD)
+        
+        server = smtplib.SMTP(config.EMAIL_SMTP_SERVER, config.EMAIL_SMTP_PORT, timeout=10)
+        try:
+            server.starttls()
+            server.login(config.EMAIL_FROM, email_password)
+        except Exception:
+            server.close()
+            raise
+        
+        self._smtp = server
+        self._smtp_sends = 0
+        return server
+    
+    def _reset_smtp(self):
+        """Drop the cached SMTP connection"""
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+        self._smtp = None
+        self._smtp_sends = 0
+    
+    def close(self):
+        """Deliver queued alerts and close persistent connections held by the alert system"""
+        if self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout=30)
+        self._dispatcher.shutdown(wait=True)
+        self._reset_smtp()
+        self._http.close()
+    
     def _validate_email_config(self) -> bool:
         """Validate email configuration"""
         try:
@@ -235,7 +370,16 @@ class AlertSystem:
         Args:
             alert: Alert data dictionary
         """
-        if not self.webhook_enabled:
+        self.send_webhook_alerts_batch([alert])
+    
+    def send_webhook_alerts_batch(self, alerts: List[Dict]):
+        """
+        Send several alerts in a single webhook request
+        
+        Args:
+            alerts: List of alert data dictionaries
+        """
+        if not self.webhook_enabled or not alerts:
             return
             
         try:
@@ -245,52 +389,65 @@ class AlertSystem:
                 return
             
             # Prepare webhook payload
+            if len(alerts) == 1:
+                text = self._get_alert_message(alerts[0])
+            else:
+                text = f"{len(alerts)} price alerts"
+            
             payload = {
-                'text': alert['message'],
-                'attachments': [{
-                    'color': 'danger' if alert['change_24h'] < 0 else 'good',
-                    'fields': [
-                        {
-                            'title': 'Asset',
-                            'value': alert['symbol'].upper(),
-                            'short': True
-                        },
-                        {
-                            'title': 'Current Price',
-                            'value': f"${alert['price']:,.2f}",
-                            'short': True
-                        },
-                        {
-                            'title': '24h Change',
-                            'value': f"{alert['change_24h']:+.2f}%",
-                            'short': True
-                        },
-                        {
-                            'title': 'Threshold',
-                            'value': f"±{alert['threshold']}%",
-                            'short': True
-                        }
-                    ],
-                    'footer': f"Alert triggered at {alert['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
-                }]
+                'text': text,
+                'attachments': [self._build_attachment(alert) for alert in alerts]
             }
             
-            # Send webhook with timeout
-            response = requests.post(
-                config.WEBHOOK_URL,
-                json=payload,
-                timeout=10,
-                headers={'Content-Type': 'application/json'}
-            )
+            # Send webhook with timeout over the pooled session
+            response = self._http.post(config.WEBHOOK_URL, json=payload, timeout=10)
             response.raise_for_status()
             
-            logger.info(f"Webhook alert sent for {alert['symbol']}")
+            symbols = ', '.join(alert['symbol'] for alert in alerts)
+            logger.info(f"Webhook alert sent for {symbols}")
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Error sending webhook alert: {e}")
         except Exception as e:
             logger.error(f"Unexpected error sending webhook alert: {e}")
     
+    def _build_attachment(self, alert: Dict) -> Dict:
+        """
+        Build the webhook attachment describing a single alert
+        
+        Args:
+            alert: Alert data dictionary
+            
+        Returns:
+            Attachment dictionary for the webhook payload
+        """
+        return {
+            'color': 'danger' if alert['change_24h'] < 0 else 'good',
+            'fields': [
+                {
+                    'title': 'Asset',
+                    'value': alert['symbol'].upper(),
+                    'short': True
+                },
+                {
+                    'title': 'Current Price',
+                    'value': f"${alert['price']:,.2f}",
+                    'short': True
+                },
+                {
+                    'title': '24h Change',
+                    'value': f"{alert['change_24h']:+.2f}%",
+                    'short': True
+                },
+                {
+                    'title': 'Threshold',
+                    'value': f"±{alert['threshold']}%",
+                    'short': True
+                }
+            ],
+            'footer': f"Alert triggered at {alert['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}"
+        }
+    
     def _validate_webhook_config(self) -> bool:
         """Validate webhook configuration"""
         try:
@@ -300,9 +457,66 @@ class AlertSystem:
         except Exception:
             return False
     
+    def _send_email_alerts(self, alerts: List[Dict]):
+        """
+        Send alerts via email one after another on the shared SMTP connection
+        
+        Args:
+            alerts: List of alert data dictionaries
+        """
+        for alert in alerts:
+            self.send_email_alert(alert)
+    
+    def _dispatch_alerts(self, alerts: List[Dict]):
+        """
+        Deliver alerts to all configured channels
+        
+        Args:
+            alerts: List of alert data dictionaries
+        """
+        for alert in alerts:
+            self.send_terminal_alert(alert)
+        
+        # Email and webhook delivery run in parallel so a slow channel
+        # does not delay the other
+        wait([
+            self._dispatcher.submit(self._send_email_alerts, alerts),
+            self._dispatcher.submit(self.send_webhook_alerts_batch, alerts)
+        ])
+        
+        logger.info(f"Processed {len(alerts)} price alerts")
+    
+    def _drain(self):
+        """Background worker delivering queued alerts until a None sentinel is received"""
+        while True:
+            alert = self._queue.get()
+            if alert is None:
+                return
+            
+            # Deliver everything already waiting as one batch
+            batch = [alert]
+            stop = False
+            while True:
+                try:
+                    pending = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stop = True
+                    break
+                batch.append(pending)
+            
+            try:
+                self._dispatch_alerts(batch)
+            except Exception as e:
+                logger.error(f"Error dispatching alerts: {e}")
+            
+            if stop:
+                return
+    
     def process_alerts(self, prices: Dict):
         """
-        Process all alerts for current prices
+        Check prices and queue any alerts for background delivery
         
         Args:
             prices: Dict of current price data
@@ -310,13 +524,10 @@ class AlertSystem:
         alerts = self.check_price_alerts(prices)
         
         for alert in alerts:
-            # Send to all configured channels
-            self.send_terminal_alert(alert)
-            self.send_email_alert(alert)
-            self.send_webhook_alert(alert)
-            
-        if alerts:
-            logger.info(f"Processed {len(alerts)} price alerts")
+            try:
+                self._queue.put_nowait(alert)
+            except queue.Full:
+                logger.warning(f"Alert queue is full, dropping alert for {alert['symbol']}")
     
     def get_alert_stats(self) -> Dict:
         """
@@ -325,16 +536,19 @@ class AlertSystem:
         Returns:
             Dict with alert statistics
         """
-        current_time = datetime.now()
-        active_alerts = 0
+        now_mono = time.monotonic()
         
-        for symbol, last_alert_time in self.last_alerts.items():
-            time_since_last = current_time - last_alert_time
-            if time_since_last.total_seconds() < self.cooldown:
+        # Entries are ordered by alert time, so stop at the first expired one
+        active_alerts = 0
+        with self._alerts_lock:
+            for last_alert_time in reversed(self.last_alerts.values()):
+                if now_mono - last_alert_time >= self.cooldown:
+                    break
                 active_alerts += 1
+            total_alerts = len(self.last_alerts)
         
         return {
-            'total_alerts_sent': len(self.last_alerts),
+            'total_alerts_sent': total_alerts,
             'active_alerts': active_alerts,
             'threshold': self.threshold,
             'cooldown_seconds': self.cooldown,
@@ -400,4 +614,7 @@ if __name__ == "__main__":
     
     # Test stats
     stats = alert_system.get_alert_stats()
-    print("Alert stats:", stats) 
\ No newline at end of file
+    print("Alert stats:", stats)
+    
+    # Wait for queued alerts to be delivered
+    alert_system.close() 
\ No newline at end of file
@@ -28,23 +28,34 @@ STOCK_ASSETS = [
 # Database Configuration
 DATABASE_PATH = "database/price_data.db"
 CSV_LOG_PATH = "logs/price_logs.csv"
+WAL_CHECKPOINT_INTERVAL = 300  # Seconds between passive WAL checkpoints
 
 # Update Intervals (in seconds)
 CRYPTO_UPDATE_INTERVAL = 60  # 1 minute
 STOCK_UPDATE_INTERVAL = 300   # 5 minutes
 
+# Scheduler Configuration
+SCHEDULER_MAX_WORKERS = 4  # Threads available to scheduled jobs
+SCHEDULER_MISFIRE_GRACE_TIME = 30  # Seconds a late job may still run
+
 # Alert Configuration
 ALERT_THRESHOLD = 5.0  # 5% price change
 ALERT_COOLDOWN = 300   # 5 minutes between alerts
+MAX_ALERT_ENTRIES = 10000  # Maximum assets tracked for alert cooldowns
+ALERT_QUEUE_SIZE = 1000  # Maximum alerts waiting for background delivery
 
 # Web Dashboard Configuration
 FLASK_HOST = "127.0.0.1"  # Changed from 0.0.0.0 for security
 FLASK_PORT = 5000
 FLASK_DEBUG = False  # Disabled for production security
+DASHBOARD_THREADS = 8  # Request handler threads for the waitress server
 
 # API Configuration
 COINGECKO_API_URL = "https://api.coingecko.com/api/v3"
 COINGECKO_RATE_LIMIT = 50  # requests per minute
+COINGECKO_MARKETS_PAGE_SIZE = 250  # Maximum ids per /coins/markets request
+STOCK_FETCH_WORKERS = 8  # Concurrent Yahoo Finance lookups
+PRICE_TTL_SECONDS = 30  # Reuse fetched prices for this many seconds
 
 # Logging Configuration
 LOG_LEVEL = "INFO"
@@ -57,6 +68,7 @@ EMAIL_SMTP_PORT = 587
 EMAIL_FROM = "your-email@gmail.com"
 EMAIL_TO = "recipient@example.com"
 EMAIL_PASSWORD = ""  # Set in environment variable
+EMAIL_MAX_SENDS_PER_CONNECTION = 100  # Recycle the SMTP connection after this many emails
 
 # Webhook Configuration (optional)
 WEBHOOK_ENABLED = False
@@ -65,6 +77,7 @@ WEBHOOK_URL = "https://your-webhook-url.com/endpoint"
 # Chart Configuration
 CHART_HISTORY_HOURS = 24  # Hours of historical data to show
 CHART_UPDATE_INTERVAL = 60  # Chart update interval in seconds
+STATS_CACHE_TTL = 5  # Seconds to cache alert and database stats for the dashboard
 
 # Security Configuration
 MAX_REQUESTS_PER_MINUTE = 60  # Rate limiting
@@ -78,6 +91,7 @@ DEFAULT_HISTORY_HOURS = 24  # Default hours of history
 MAX_HISTORY_HOURS = 8760  # Maximum hours of history (1 year)
 DEFAULT_CLEANUP_DAYS = 30  # Default days for cleanup
 MAX_CLEANUP_DAYS = 3650  # Maximum days for cleanup (10 years)
+CLEANUP_BATCH_SIZE = 5000  # Rows deleted per cleanup transaction
 
 # Validation Constants
 MIN_THRESHOLD = 0.1  # Minimum alert threshold
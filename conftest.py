@@ -0,0 +1,62 @@
+"""
+pytest configuration for the integration tests
+
+Adds --skip-unchanged, which skips tests that passed on an earlier run when
+none of the source files they depend on have been modified since. Combine it
+with pytest's own --lf/--ff to rerun only failing or touched tests while
+iterating on one component.
+"""
+
+import os
+import time
+import pytest
+
+# pytest cache key holding {test node id: start time of the run it last passed in}
+LAST_PASSED_KEY = "crypto_dashboard/last_passed"
+
+class LastPassedTracker:
+    """Records when each test last passed and skips the ones with unchanged sources"""
+
+    def __init__(self, config):
+        self.config = config
+        self.cache = getattr(config, "cache", None)  # None when the cacheprovider plugin is disabled
+        self.last_passed = self.cache.get(LAST_PASSED_KEY, {}) if self.cache is not None else {}
+        self.started = time.time()
+
+    def _dependency_mtime(self, item) -> float:
+        """Latest modification time of the test file and the modules listed in TEST_DEPENDENCIES"""
+        dependencies = getattr(item.module, "TEST_DEPENDENCIES", {}).get(item.originalname, ())
+        paths = [str(item.path)] + [os.path.join(str(self.config.rootpath), p) for p in dependencies]
+        return max(os.path.getmtime(p) for p in paths if os.path.exists(p))
+
+    def pytest_collection_modifyitems(self, items):
+        if not self.config.getoption("--skip-unchanged"):
+            return
+
+        skip = pytest.mark.skip(reason="passed previously and its sources are unchanged")
+        for item in items:
+            passed_at = self.last_passed.get(item.nodeid)
+            if passed_at is not None and self._dependency_mtime(item) < passed_at:
+                item.add_marker(skip)
+
+    def pytest_runtest_logreport(self, report):
+        # Skipped tests keep their earlier entry; failures drop it so they always rerun
+        if report.when == "call" and report.passed:
+            self.last_passed[report.nodeid] = self.started
+        elif report.failed:
+            self.last_passed.pop(report.nodeid, None)
+
+    def pytest_sessionfinish(self):
+        if self.cache is not None:
+            self.cache.set(LAST_PASSED_KEY, self.last_passed)
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--skip-unchanged",
+        action="store_true",
+        default=False,
+        help="skip tests that already passed and whose source files are unchanged since"
+    )
+
+def pytest_configure(config):
+    config.pluginmanager.register(LastPassedTracker(config), "last_passed_tracker")
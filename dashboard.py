@@ -3,25 +3,144 @@ Flask Web Dashboard
 Provides real-time price display and historical charts
 """
 
-from flask import Flask, render_template, jsonify, request, abort
+from flask import Flask, render_template, jsonify, request, abort, Response
+from flask.json.provider import DefaultJSONProvider
+import orjson
 import json
+import hashlib
 import logging
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
 from typing import Dict, List, Optional
 from functools import wraps
 import config
 from price_scraper import price_scraper
-from data_logger import data_logger
+from data_logger import get_data_logger
 from alert_system import alert_system
 
 # Set up logging
 logging.basicConfig(level=getattr(logging, config.LOG_LEVEL), format=config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(
+            obj,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
-# Simple rate limiting
+# Simple rate limiting: client IP -> [request count, monotonic window reset time]
 request_counts = {}
+_RATE_LIMIT_WINDOW = 60.0  # Seconds per rate limit window
+_RATE_LIMIT_SWEEP_EVERY = 1000  # Requests between sweeps of expired windows
+_requests_since_sweep = 0
+
+# Short-lived cache for expensive dashboard data: key -> (expires_at, value)
+_data_cache = {}
+_data_cache_lock = threading.Lock()
+_load_locks = {}  # key -> lock held while that key is being loaded
+
+# Lowercased set of configured symbols for O(1) validation
+_VALID_SYMBOLS = frozenset(s.lower() for s in config.CRYPTO_ASSETS + config.STOCK_ASSETS)
+
+def _sweep_request_counts(now: float):
+    """Periodically drop rate limit windows that have already expired"""
+    global _requests_since_sweep
+    _requests_since_sweep += 1
+    if _requests_since_sweep < _RATE_LIMIT_SWEEP_EVERY:
+        return
+    
+    _requests_since_sweep = 0
+    # Snapshot the items: other request threads may add IPs while we scan
+    expired = [ip for ip, bucket in list(request_counts.items()) if now >= bucket[1]]
+    for ip in expired:
+        request_counts.pop(ip, None)
+
+def _cached(key: str, ttl: float, loader, should_cache=None):
+    """
+    Return a cached value for key, calling loader() when it is older than ttl seconds
+    
+    Only one thread loads a given key at a time; the others wait for it and reuse
+    its result instead of all calling loader() when the entry expires.
+    
+    Args:
+        key: Cache key
+        ttl: Seconds a loaded value stays fresh
+        loader: Zero-argument callable producing the value
+        should_cache: Optional predicate; values it rejects are returned but not cached
+        
+    Returns:
+        The cached or freshly loaded value
+    """
+    now = time.monotonic()
+    with _data_cache_lock:
+        entry = _data_cache.get(key)
+        if entry is not None and now < entry[0]:
+            return entry[1]
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    
+    with load_lock:
+        # Another thread may have refreshed the entry while we waited for the lock
+        now = time.monotonic()
+        with _data_cache_lock:
+            entry = _data_cache.get(key)
+            if entry is not None and now < entry[0]:
+                return entry[1]
+        
+        value = loader()
+        if should_cache is None or should_cache(value):
+            with _data_cache_lock:
+                _data_cache[key] = (now + ttl, value)
+    return value
+
+def _invalidate_cache(*keys: str):
+    """Drop cached values so the next request reloads them"""
+    with _data_cache_lock:
+        for key in keys:
+            _data_cache.pop(key, None)
+
+def _cache_ttl_remaining(key: str) -> int:
+    """Whole seconds until the cached value for key expires (0 when it isn't cached)"""
+    with _data_cache_lock:
+        entry = _data_cache.get(key)
+    if entry is None:
+        return 0
+    return max(0, int(entry[0] - time.monotonic()))
+
+def _load_prices() -> tuple:
+    """Fetch current prices and pre-serialize the /api/prices response body"""
+    prices = price_scraper.get_all_prices()
+    body = app.json.dumps({
+        'success': True,
+        'data': prices,
+        'timestamp': datetime.now().isoformat()
+    })
+    etag = hashlib.blake2b(body.encode(), digest_size=8).hexdigest()
+    return prices, body, etag
+
+def _cached_prices_entry() -> tuple:
+    """(prices, response body, etag), refreshed at most once per crypto update interval"""
+    # A failed scrape returns no prices; don't serve that for a whole interval
+    return _cached('all_prices', config.CRYPTO_UPDATE_INTERVAL, _load_prices,
+                   should_cache=lambda entry: bool(entry[0]))
+
+def _cached_alert_stats() -> Dict:
+    """Alert statistics, refreshed at most every STATS_CACHE_TTL seconds"""
+    return _cached('alert_stats', config.STATS_CACHE_TTL, alert_system.get_alert_stats)
+
+def _cached_summary_stats() -> Dict:
+    """Database summary statistics, refreshed at most every STATS_CACHE_TTL seconds"""
+    return _cached('summary_stats', config.STATS_CACHE_TTL, get_data_logger().get_summary_stats)
 
 def rate_limit(f):
     """Rate limiting decorator"""
@@ -31,22 +150,18 @@ def rate_limit(f):
             return f(*args, **kwargs)
             
         client_ip = request.remote_addr
-        current_time = datetime.now()
-        
-        # Clean old entries
-        request_counts.clear()
-        
-        if client_ip not in request_counts:
-            request_counts[client_ip] = {'count': 0, 'reset_time': current_time + timedelta(minutes=1)}
+        now = time.monotonic()
         
-        if current_time > request_counts[client_ip]['reset_time']:
-            request_counts[client_ip] = {'count': 0, 'reset_time': current_time + timedelta(minutes=1)}
+        _sweep_request_counts(now)
         
-        request_counts[client_ip]['count'] += 1
-        
-        if request_counts[client_ip]['count'] > config.MAX_REQUESTS_PER_MINUTE:
+        bucket = request_counts.get(client_ip)
+        if bucket is None or now >= bucket[1]:
+            request_counts[client_ip] = [1, now + _RATE_LIMIT_WINDOW]
+        elif bucket[0] >= config.MAX_REQUESTS_PER_MINUTE:
             logger.warning(f"Rate limit exceeded for IP: {client_ip}")
             return jsonify({'error': 'Rate limit exceeded'}), 429
+        else:
+            bucket[0] += 1
         
         return f(*args, **kwargs)
     return decorated_function
@@ -57,43 +172,38 @@ def validate_symbol(symbol: str) -> bool:
         return False
     
     # Check if symbol exists in configured assets
-    all_symbols = config.CRYPTO_ASSETS + config.STOCK_ASSETS
-    return symbol.lower() in [s.lower() for s in all_symbols]
+    return symbol.lower() in _VALID_SYMBOLS
+
+def invalidate_symbol_cache():
+    """Rebuild the valid symbol set after the configured asset lists change"""
+    global _VALID_SYMBOLS
+    _VALID_SYMBOLS = frozenset(s.lower() for s in config.CRYPTO_ASSETS + config.STOCK_ASSETS)
 
 def validate_numeric_input(value: any, min_val: Optional[float] = None, max_val: Optional[float] = None) -> Optional[float]:
     """Validate and convert numeric input"""
-    try:
-        num_val = float(value)
-        if min_val is not None and num_val < min_val:
-            return None
-        if max_val is not None and num_val > max_val:
+    # Fast path for values Flask or the JSON parser already made numeric
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        num_val = value
+    else:
+        try:
+            num_val = float(value)
+        except (ValueError, TypeError):
             return None
-        return num_val
-    except (ValueError, TypeError):
+    
+    if min_val is not None and num_val < min_val:
+        return None
+    if max_val is not None and num_val > max_val:
         return None
+    return float(num_val)
 
 @app.route('/')
 @rate_limit
 def index():
     """Main dashboard page"""
     try:
-        # Get current prices
-        current_prices = price_scraper.get_all_prices()
-        
-        # Get latest logged prices
-        latest_prices = data_logger.get_latest_prices(20)
-        
-        # Get alert stats
-        alert_stats = alert_system.get_alert_stats()
-        
-        # Get summary stats
-        summary_stats = data_logger.get_summary_stats()
-        
-        return render_template('dashboard.html',
-                             current_prices=current_prices,
-                             latest_prices=latest_prices.to_dict('records') if not latest_prices.empty else [],
-                             alert_stats=alert_stats,
-                             summary_stats=summary_stats)
+        # Prices, stats and alerts are loaded client-side from the JSON API,
+        # so the page itself is rendered without querying any data
+        return render_template('dashboard.html')
                              
     except Exception as e:
         logger.error(f"Error rendering dashboard: {e}")
@@ -104,12 +214,17 @@ def index():
 def api_prices():
     """API endpoint for current prices"""
     try:
-        prices = price_scraper.get_all_prices()
-        return jsonify({
-            'success': True,
-            'data': prices,
-            'timestamp': datetime.now().isoformat()
-        })
+        _, body, etag = _cached_prices_entry()
+        
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        
+        response.set_etag(etag)
+        # Let clients reuse the body only for as long as our own copy stays fresh
+        response.headers['Cache-Control'] = f"public, max-age={_cache_ttl_remaining('all_prices')}"
+        return response
     except Exception as e:
         logger.error(f"Error fetching prices: {e}")
         return jsonify({
@@ -135,7 +250,7 @@ def api_chart(symbol):
         if hours is None:
             hours = config.CHART_HISTORY_HOURS
         
-        history = data_logger.get_asset_history(symbol, int(hours))
+        history = get_data_logger().get_asset_history(symbol, int(hours))
         
         if history.empty:
             return jsonify({
@@ -171,7 +286,7 @@ def api_chart(symbol):
 def api_alerts():
     """API endpoint for alert statistics"""
     try:
-        alert_stats = alert_system.get_alert_stats()
+        alert_stats = _cached_alert_stats()
         return jsonify({
             'success': True,
             'data': alert_stats
@@ -188,7 +303,7 @@ def api_alerts():
 def api_stats():
     """API endpoint for system statistics"""
     try:
-        summary_stats = data_logger.get_summary_stats()
+        summary_stats = _cached_summary_stats()
         return jsonify({
             'success': True,
             'data': summary_stats
@@ -222,6 +337,7 @@ def api_update_threshold():
             }), 400
         
         alert_system.update_threshold(threshold)
+        _invalidate_cache('alert_stats')
         
         return jsonify({
             'success': True,
@@ -257,6 +373,7 @@ def api_update_cooldown():
             }), 400
         
         alert_system.update_cooldown(int(cooldown))
+        _invalidate_cache('alert_stats')
         
         return jsonify({
             'success': True,
@@ -291,7 +408,8 @@ def api_cleanup():
                 'error': 'Invalid days value (must be between 1 and 365)'
             }), 400
         
-        data_logger.cleanup_old_data(int(days))
+        get_data_logger().cleanup_old_data(int(days))
+        _invalidate_cache('summary_stats')
         
         return jsonify({
             'success': True,
@@ -3,23 +3,74 @@ Data Logger Module
 Handles CSV and SQLite storage with duplicate prevention
 """
 
+import csv
 import sqlite3
 import pandas as pd
 import os
 import logging
+import threading
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Dict, List, Optional
 import config
+from security_config import SecurityConfig
 
 # Set up logging
 logging.basicConfig(level=getattr(logging, config.LOG_LEVEL), format=config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+# Applied to every new connection (these settings are not stored in the database file)
+CONNECTION_PRAGMAS = (
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA wal_autocheckpoint=1000',
+)
+
+INSERT_PRICE_SQL = '''
+    INSERT OR IGNORE INTO price_data (timestamp, symbol, price, change_24h, asset_type)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+# Timestamps are stored as integer epoch seconds and rendered back as local time on read
+LATEST_PRICES_SQL = '''
+    SELECT datetime(timestamp, 'unixepoch', 'localtime'), symbol, price, change_24h, asset_type
+    FROM price_data
+    ORDER BY price_data.timestamp DESC
+    LIMIT ?
+'''
+LATEST_PRICES_COLUMNS = ['timestamp', 'symbol', 'price', 'change_24h', 'asset_type']
+
+ASSET_HISTORY_SQL = '''
+    SELECT datetime(timestamp, 'unixepoch', 'localtime') AS timestamp, price, change_24h
+    FROM price_data
+    WHERE symbol = ?
+    AND price_data.timestamp BETWEEN ? AND ?
+    ORDER BY price_data.timestamp ASC
+'''
+
+SUMMARY_STATS_SQL = '''
+    SELECT COUNT(*), COUNT(DISTINCT symbol),
+           datetime(MIN(timestamp), 'unixepoch', 'localtime'),
+           datetime(MAX(timestamp), 'unixepoch', 'localtime')
+    FROM price_data
+'''
+
+DELETE_OLD_SQL = '''
+    DELETE FROM price_data
+    WHERE rowid IN (SELECT rowid FROM price_data WHERE timestamp < ? LIMIT ?)
+'''
+
 class DataLogger:
     def __init__(self):
         self.db_path = config.DATABASE_PATH
         self.csv_path = config.CSV_LOG_PATH
         self._ensure_directories()
+        
+        # One shared connection; the lock serializes access from the scheduler and Flask threads
+        self._lock = threading.RLock()
+        self._conn = self._connect()
         self._init_database()
         self._init_csv()
         
@@ -28,17 +79,36 @@ class DataLogger:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
         
+    def _connect(self) -> sqlite3.Connection:
+        """Open a database connection with the per-connection performance PRAGMAs applied"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+        
     def _init_database(self):
         """Initialize SQLite database with proper schema"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            with self._lock:
+                self._create_schema()
+            logger.info("Database initialized successfully")
+            
+        except Exception as e:
+            logger.error("Error initializing database: %s", e)
+            
+    def _create_schema(self):
+        """Create tables and indexes if they don't exist"""
+        with self._conn:
+            cursor = self._conn.cursor()
+            
+            # WAL lets readers proceed during writes; the mode persists in the file
+            cursor.execute('PRAGMA journal_mode=WAL')
             
             # Create price_data table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS price_data (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME NOT NULL,
+                    timestamp INTEGER NOT NULL,
                     symbol TEXT NOT NULL,
                     price REAL NOT NULL,
                     change_24h REAL,
@@ -53,59 +123,58 @@ class DataLogger:
                 ON price_data(timestamp, symbol)
             ''')
             
-            conn.commit()
-            conn.close()
-            logger.info("Database initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"Error initializing database: {e}")
-            
-    def _init_csv(self):
-        """Initialize CSV file with headers if it doesn't exist"""
-        if not os.path.exists(self.csv_path):
-            try:
-                df = pd.DataFrame(columns=pd.Index(['timestamp', 'symbol', 'price', 'change_24h', 'asset_type']))
-                df.to_csv(self.csv_path, index=False)
-                logger.info("CSV file initialized successfully")
-            except Exception as e:
-                logger.error(f"Error initializing CSV file: {e}")
-                
-    def _is_duplicate(self, symbol: str, timestamp: datetime, asset_type: str) -> bool:
-        """
-        Check if a price entry already exists for the given symbol and time window
-        
-        Args:
-            symbol: Asset symbol
-            timestamp: Price timestamp
-            asset_type: 'crypto' or 'stock'
-            
-        Returns:
-            True if duplicate exists within 1 minute window
-        """
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check for entries within 1 minute of the timestamp
-            time_window = timedelta(minutes=1)
-            start_time = timestamp - time_window
-            end_time = timestamp + time_window
-            
+            # Covering index so per-asset history is an index-only range scan
             cursor.execute('''
-                SELECT COUNT(*) FROM price_data 
-                WHERE symbol = ? AND asset_type = ? 
-                AND timestamp BETWEEN ? AND ?
-            ''', (symbol, asset_type, start_time, end_time))
+                CREATE INDEX IF NOT EXISTS idx_symbol_ts_cover
+                ON price_data(symbol, timestamp, price, change_24h)
+            ''')
             
-            count = cursor.fetchone()[0]
-            conn.close()
+            # At most one entry per asset per minute, enforced by the engine
+            has_unique_index = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uniq_symbol_type_epoch_minute'"
+            ).fetchone()
+            if not has_unique_index:
+                # Older versions stored local-time text timestamps; convert them to epoch seconds
+                cursor.execute('DROP INDEX IF EXISTS uniq_symbol_type_minute')
+                cursor.execute('''
+                    UPDATE price_data
+                    SET timestamp = CAST(strftime('%s', timestamp, 'utc') AS INTEGER)
+                    WHERE typeof(timestamp) = 'text'
+                ''')
+                # Drop same-minute duplicates left by older versions so the index can be built
+                cursor.execute('''
+                    DELETE FROM price_data WHERE id NOT IN (
+                        SELECT MIN(id) FROM price_data
+                        GROUP BY symbol, asset_type, timestamp / 60
+                    )
+                ''')
+                cursor.execute('''
+                    CREATE UNIQUE INDEX uniq_symbol_type_epoch_minute
+                    ON price_data(symbol, asset_type, timestamp / 60)
+                ''')
             
-            return count > 0
+            # Gather planner statistics once so the new indexes are picked up
+            has_stats = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+            ).fetchone()
+            if not has_stats:
+                cursor.execute('ANALYZE')
             
+    def _init_csv(self):
+        """Open the CSV log for appending, writing headers if it doesn't exist"""
+        self._csv_fp = None
+        self._csv_writer = None
+        try:
+            is_new = not os.path.exists(self.csv_path)
+            self._csv_fp = open(self.csv_path, 'a', newline='', buffering=65536)
+            self._csv_writer = csv.writer(self._csv_fp)
+            if is_new:
+                self._csv_writer.writerow(['timestamp', 'symbol', 'price', 'change_24h', 'asset_type'])
+                self._csv_fp.flush()
+                logger.info("CSV file initialized successfully")
         except Exception as e:
-            logger.error(f"Error checking for duplicates: {e}")
-            return False
-            
+            logger.error("Error initializing CSV file: %s", e)
+                
     def log_prices(self, prices: Dict) -> int:
         """
         Log price data to both CSV and SQLite
@@ -127,17 +196,7 @@ class DataLogger:
             data_to_log = []
             current_time = datetime.now()
             
-            for symbol, price_data in prices.items():
-                # Validate input data
-                if not self._validate_price_data(symbol, price_data):
-                    logger.warning(f"Invalid price data for {symbol}, skipping")
-                    continue
-                
-                # Check for duplicates
-                if self._is_duplicate(symbol, current_time, price_data['type']):
-                    logger.debug(f"Skipping duplicate entry for {symbol}")
-                    continue
-                    
+            for symbol, price_data in self._validate_prices(prices):
                 data_to_log.append({
                     'timestamp': current_time,
                     'symbol': symbol,
@@ -147,95 +206,130 @@ class DataLogger:
                 })
                 
             if not data_to_log:
-                logger.info("No new data to log (all entries were duplicates)")
+                logger.info("No valid data to log")
                 return 0
                 
-            # Log to SQLite
-            logged_count += self._log_to_sqlite(data_to_log)
+            # Log to SQLite; duplicates are rejected by the unique index
+            data_to_log = self._log_to_sqlite(data_to_log, int(current_time.timestamp()))
+            if not data_to_log:
+                logger.info("No new data to log (all entries were duplicates)")
+                return 0
+            logged_count += len(data_to_log)
             
             # Log to CSV
             logged_count += self._log_to_csv(data_to_log)
             
-            logger.info(f"Successfully logged {logged_count} price entries")
+            logger.info("Successfully logged %d price entries", logged_count)
             return logged_count
             
         except Exception as e:
-            logger.error(f"Error logging prices: {e}")
+            logger.error("Error logging prices: %s", e)
             return 0
     
-    def _validate_price_data(self, symbol: str, price_data: Dict) -> bool:
-        """Validate price data before logging"""
-        from security_config import SecurityConfig
-        return SecurityConfig.validate_price_data(symbol, price_data)
+    def _validate_prices(self, prices: Dict) -> List[tuple]:
+        """
+        Validate a whole tick of price data before logging
+        
+        Uses the same rules as the alert system (SecurityConfig.validate_price_data),
+        applied to the batch in one vectorized pass.
+        
+        Args:
+            prices: Dict of price data from price scraper
             
-    def _log_to_sqlite(self, data: List[Dict]) -> int:
-        """Log data to SQLite database"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+        Returns:
+            List of (symbol, price_data) pairs that passed validation
+        """
+        valid = SecurityConfig.validate_price_batch(prices)
+        
+        if len(valid) < len(prices):
+            valid_symbols = {symbol for symbol, _ in valid}
+            for symbol in prices:
+                if symbol not in valid_symbols:
+                    logger.warning("Invalid price data for %s, skipping", symbol)
+        return valid
+            
+    def _log_to_sqlite(self, data: List[Dict], timestamp: int) -> List[Dict]:
+        """
+        Log data to SQLite database, skipping entries already logged this minute
+        
+        Args:
+            data: Entries to insert, all from the same tick
+            timestamp: Epoch seconds stored for every entry in this batch
             
-            for entry in data:
-                cursor.execute('''
-                    INSERT INTO price_data (timestamp, symbol, price, change_24h, asset_type)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', (
-                    entry['timestamp'],
-                    entry['symbol'],
-                    entry['price'],
-                    entry['change_24h'],
-                    entry['asset_type']
-                ))
-                
-            conn.commit()
-            conn.close()
-            return len(data)
+        Returns:
+            Entries that were actually inserted
+        """
+        try:
+            rows = [
+                (timestamp, e['symbol'], e['price'], e['change_24h'], e['asset_type'])
+                for e in data
+            ]
+            
+            # Single transaction for the whole batch; each row's rowcount says whether
+            # it was inserted or ignored by the unique index (the statement is cached)
+            inserted = []
+            with self._lock, self._conn:
+                execute = self._conn.execute
+                for e, row in zip(data, rows):
+                    if execute(INSERT_PRICE_SQL, row).rowcount:
+                        inserted.append(e)
+                    else:
+                        logger.debug("Skipping duplicate entry for %s", e['symbol'])
+            
+            return inserted
             
         except Exception as e:
-            logger.error(f"Error logging to SQLite: {e}")
-            return 0
+            logger.error("Error logging to SQLite: %s", e)
+            return []
             
     def _log_to_csv(self, data: List[Dict]) -> int:
         """Log data to CSV file"""
         try:
-            df_new = pd.DataFrame(data)
-            df_new.to_csv(self.csv_path, mode='a', header=False, index=False)
+            with self._lock:
+                self._csv_writer.writerows(
+                    (e['timestamp'], e['symbol'], e['price'], e['change_24h'], e['asset_type'])
+                    for e in data
+                )
+                self._csv_fp.flush()
             return len(data)
             
         except Exception as e:
-            logger.error(f"Error logging to CSV: {e}")
+            logger.error("Error logging to CSV: %s", e)
             return 0
             
-    def get_latest_prices(self, limit: int = 50) -> pd.DataFrame:
+    def get_latest_prices_records(self, limit: int = 50) -> List[tuple]:
         """
-        Get the latest price entries
+        Get the latest price entries as plain row tuples, without building a DataFrame
         
         Args:
             limit: Maximum number of entries to return
             
         Returns:
-            DataFrame with latest price data
+            List of (timestamp, symbol, price, change_24h, asset_type) tuples
         """
         try:
             # Validate limit parameter
             if not isinstance(limit, int) or limit <= 0 or limit > config.MAX_LIMIT:
                 limit = config.DEFAULT_LIMIT
             
-            conn = sqlite3.connect(self.db_path)
-            query = '''
-                SELECT timestamp, symbol, price, change_24h, asset_type
-                FROM price_data
-                ORDER BY timestamp DESC
-                LIMIT ?
-            '''
+            with self._lock:
+                return self._conn.execute(LATEST_PRICES_SQL, (limit,)).fetchall()
             
-            df = pd.read_sql_query(query, conn, params=[limit])
-            conn.close()
+        except Exception as e:
+            logger.error("Error getting latest prices: %s", e)
+            return []
             
-            return df
+    def get_latest_prices(self, limit: int = 50) -> pd.DataFrame:
+        """
+        Get the latest price entries
+        
+        Args:
+            limit: Maximum number of entries to return
             
-        except Exception as e:
-            logger.error(f"Error getting latest prices: {e}")
-            return pd.DataFrame()
+        Returns:
+            DataFrame with latest price data
+        """
+        return pd.DataFrame(self.get_latest_prices_records(limit), columns=LATEST_PRICES_COLUMNS)
             
     def get_asset_history(self, symbol: str, hours: int = 24) -> pd.DataFrame:
         """
@@ -256,27 +350,20 @@ class DataLogger:
             if not isinstance(hours, int) or hours <= 0 or hours > config.MAX_HISTORY_HOURS:
                 hours = config.DEFAULT_HISTORY_HOURS
             
-            conn = sqlite3.connect(self.db_path)
-            
             # Calculate time range
             end_time = datetime.now()
             start_time = end_time - timedelta(hours=hours)
             
-            query = '''
-                SELECT timestamp, price, change_24h
-                FROM price_data
-                WHERE symbol = ?
-                AND timestamp BETWEEN ? AND ?
-                ORDER BY timestamp ASC
-            '''
-            
-            df = pd.read_sql_query(query, conn, params=[symbol, start_time, end_time])
-            conn.close()
+            with self._lock:
+                df = pd.read_sql_query(
+                    ASSET_HISTORY_SQL, self._conn,
+                    params=[symbol, int(start_time.timestamp()), int(end_time.timestamp())]
+                )
             
             return df
             
         except Exception as e:
-            logger.error(f"Error getting asset history for {symbol}: {e}")
+            logger.error("Error getting asset history for %s: %s", symbol, e)
             return pd.DataFrame()
             
     def get_summary_stats(self) -> Dict:
@@ -287,26 +374,11 @@ class DataLogger:
             Dict with summary statistics
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get total entries
-            cursor.execute('SELECT COUNT(*) FROM price_data')
-            total_entries = cursor.fetchone()[0]
-            
-            # Get unique assets
-            cursor.execute('SELECT COUNT(DISTINCT symbol) FROM price_data')
-            unique_assets = cursor.fetchone()[0]
-            
-            # Get date range
-            cursor.execute('SELECT MIN(timestamp), MAX(timestamp) FROM price_data')
-            date_range = cursor.fetchone()
-            
-            # Get latest entry
-            cursor.execute('SELECT MAX(timestamp) FROM price_data')
-            latest_entry = cursor.fetchone()[0]
+            with self._lock:
+                row = self._conn.execute(SUMMARY_STATS_SQL).fetchone()
             
-            conn.close()
+            total_entries, unique_assets, first_entry, latest_entry = row
+            date_range = (first_entry, latest_entry)
             
             return {
                 'total_entries': total_entries,
@@ -316,7 +388,7 @@ class DataLogger:
             }
             
         except Exception as e:
-            logger.error(f"Error getting summary stats: {e}")
+            logger.error("Error getting summary stats: %s", e)
             return {}
             
     def cleanup_old_data(self, days: int = 30):
@@ -331,28 +403,56 @@ class DataLogger:
             if not isinstance(days, int) or days <= 0 or days > config.MAX_CLEANUP_DAYS:
                 days = config.DEFAULT_CLEANUP_DAYS
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             cutoff_date = datetime.now() - timedelta(days=days)
             
-            cursor.execute('DELETE FROM price_data WHERE timestamp < ?', (cutoff_date,))
-            deleted_count = cursor.rowcount
-            
-            conn.commit()
-            conn.close()
+            # Delete in bounded chunks, each in its own transaction, so the
+            # write lock is released between chunks for the logging jobs
+            deleted_count = 0
+            while True:
+                with self._lock, self._conn:
+                    cursor = self._conn.execute(
+                        DELETE_OLD_SQL, (int(cutoff_date.timestamp()), config.CLEANUP_BATCH_SIZE)
+                    )
+                    batch_count = cursor.rowcount
+                if batch_count <= 0:
+                    break
+                deleted_count += batch_count
+            
+            if deleted_count:
+                # Reclaim the WAL file now that the deletes are committed
+                with self._lock:
+                    self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            
+            logger.info("Cleaned up %d old entries", deleted_count)
             
-            logger.info(f"Cleaned up {deleted_count} old entries")
+        except Exception as e:
+            logger.error("Error cleaning up old data: %s", e)
             
+    def checkpoint(self):
+        """Copy committed WAL pages back into the database without blocking readers or writers"""
+        try:
+            with self._lock:
+                self._conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+                
         except Exception as e:
-            logger.error(f"Error cleaning up old data: {e}")
+            logger.error("Error checkpointing WAL: %s", e)
+            
+    def close(self):
+        """Close the shared database connection and CSV log"""
+        with self._lock:
+            self._conn.close()
+            if self._csv_fp is not None:
+                self._csv_fp.close()
 
-# Global logger instance
-data_logger = DataLogger()
+@lru_cache(maxsize=1)
+def get_data_logger() -> DataLogger:
+    """Return the shared DataLogger, creating it (and the database) on first use"""
+    return DataLogger()
 
 if __name__ == "__main__":
     # Test the data logger
     print("Testing Data Logger...")
+    data_logger = get_data_logger()
     
     # Test data
     test_prices = {
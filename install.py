@@ -3,16 +3,18 @@ Installation Script for Crypto/Stock Price Tracker
 Sets up the environment and installs dependencies
 """
 
+import importlib
 import subprocess
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 def run_command(command, description):
     """Run a command and handle errors"""
     print(f"Running: {description}")
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
         print(f"✓ {description} completed successfully")
         return True
     except subprocess.CalledProcessError as e:
@@ -45,9 +47,9 @@ def install_dependencies():
         print("✗ pip not found. Please install pip first.")
         return False
     
-    # Install dependencies
+    # Install dependencies in one pip call, preferring prebuilt wheels over source builds
     success = run_command(
-        f"{sys.executable} -m pip install -r requirements.txt",
+        [sys.executable, "-m", "pip", "install", "--prefer-binary", "-r", "requirements.txt"],
         "Installing dependencies from requirements.txt"
     )
     
@@ -65,6 +67,14 @@ def check_python_version():
     print(f"✓ Python version {version.major}.{version.minor}.{version.micro} is compatible")
     return True
 
+def _try_import(module):
+    """Import a module by name, returning (name, success)"""
+    try:
+        importlib.import_module(module)
+        return module, True
+    except ImportError:
+        return module, False
+
 def test_imports():
     """Test if all required modules can be imported"""
     print("\nTesting imports...")
@@ -73,6 +83,7 @@ def test_imports():
         "requests",
         "pandas", 
         "flask",
+        "waitress",
         "yfinance",
         "plotly",
         "apscheduler"
@@ -80,11 +91,14 @@ def test_imports():
     
     failed_imports = []
     
-    for module in required_modules:
-        try:
-            __import__(module)
+    # Import concurrently; results come back in the order listed above
+    with ThreadPoolExecutor(max_workers=len(required_modules)) as executor:
+        results = list(executor.map(_try_import, required_modules))
+    
+    for module, ok in results:
+        if ok:
             print(f"✓ {module}")
-        except ImportError:
+        else:
             print(f"✗ {module} - not found")
             failed_imports.append(module)
     
@@ -7,11 +7,13 @@ import time
 import threading
 import logging
 from datetime import datetime
+from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from waitress import serve
 import config
 from price_scraper import price_scraper
-from data_logger import data_logger
+from data_logger import get_data_logger
 from alert_system import alert_system
 from dashboard import app
 
@@ -21,8 +23,22 @@ logger = logging.getLogger(__name__)
 
 class PriceTracker:
     def __init__(self):
-        self.scheduler = BackgroundScheduler()
+        # Crypto and stock updates run on separate pool threads; overdue runs of
+        # the same job collapse into one instead of queueing up
+        self.scheduler = BackgroundScheduler(
+            executors={'default': ThreadPoolExecutor(config.SCHEDULER_MAX_WORKERS)},
+            job_defaults={
+                'coalesce': True,
+                'max_instances': 1,
+                'misfire_grace_time': config.SCHEDULER_MISFIRE_GRACE_TIME
+            }
+        )
         self.running = False
+        self.data_logger = get_data_logger()
+        
+        # Asset counts from the most recent scheduled updates, reported by get_status
+        self._crypto_count = 0
+        self._stock_count = 0
         
     def start(self):
         """Start the price tracker application"""
@@ -42,7 +58,7 @@ class PriceTracker:
             logger.info("Price tracker started successfully!")
             
         except Exception as e:
-            logger.error(f"Error starting price tracker: {e}")
+            logger.error("Error starting price tracker: %s", e)
             raise
     
     def _init_components(self):
@@ -52,23 +68,25 @@ class PriceTracker:
         # Test price scraper
         try:
             test_prices = price_scraper.get_all_prices()
-            logger.info(f"Price scraper initialized. Found {len(test_prices)} assets.")
+            self._stock_count = sum(1 for p in test_prices.values() if p.get('type') == 'stock')
+            self._crypto_count = len(test_prices) - self._stock_count
+            logger.info("Price scraper initialized. Found %d assets.", len(test_prices))
         except Exception as e:
-            logger.error(f"Error initializing price scraper: {e}")
+            logger.error("Error initializing price scraper: %s", e)
         
         # Test data logger
         try:
-            stats = data_logger.get_summary_stats()
-            logger.info(f"Data logger initialized. Database stats: {stats}")
+            stats = self.data_logger.get_summary_stats()
+            logger.info("Data logger initialized. Database stats: %s", stats)
         except Exception as e:
-            logger.error(f"Error initializing data logger: {e}")
+            logger.error("Error initializing data logger: %s", e)
         
         # Test alert system
         try:
             alert_stats = alert_system.get_alert_stats()
-            logger.info(f"Alert system initialized. Alert stats: {alert_stats}")
+            logger.info("Alert system initialized. Alert stats: %s", alert_stats)
         except Exception as e:
-            logger.error(f"Error initializing alert system: {e}")
+            logger.error("Error initializing alert system: %s", e)
     
     def _start_scheduler(self):
         """Start the background scheduler for periodic tasks"""
@@ -101,37 +119,50 @@ class PriceTracker:
             replace_existing=True
         )
         
+        # Schedule WAL checkpoints to keep the write-ahead log small
+        self.scheduler.add_job(
+            func=self.data_logger.checkpoint,
+            trigger=IntervalTrigger(seconds=config.WAL_CHECKPOINT_INTERVAL),
+            id='wal_checkpoint',
+            name='WAL Checkpoint',
+            replace_existing=True
+        )
+        
         self.scheduler.start()
         logger.info("Background scheduler started successfully!")
     
     def _start_dashboard(self):
-        """Start the Flask dashboard in a separate thread"""
+        """Start the Flask dashboard on the waitress WSGI server in a separate thread"""
         def run_dashboard():
             try:
-                app.run(
+                serve(
+                    app,
                     host=config.FLASK_HOST,
                     port=config.FLASK_PORT,
-                    debug=False,  # Set to False for production
-                    use_reloader=False
+                    threads=config.DASHBOARD_THREADS
                 )
             except Exception as e:
-                logger.error(f"Error starting dashboard: {e}")
+                logger.error("Error starting dashboard: %s", e)
         
-        # Start dashboard in a separate thread
+        # Start dashboard in a separate thread. It stays in this process rather than a
+        # child process: the threshold/cooldown endpoints update the same alert_system
+        # the scheduler uses, and the cached price and stats state is shared as well.
+        # waitress and SQLite release the GIL during socket and database I/O.
         dashboard_thread = threading.Thread(target=run_dashboard, daemon=True)
         dashboard_thread.start()
-        logger.info(f"Dashboard started at http://{config.FLASK_HOST}:{config.FLASK_PORT}")
+        logger.info("Dashboard started at http://%s:%s", config.FLASK_HOST, config.FLASK_PORT)
     
     def _update_crypto_prices(self):
         """Update crypto prices and process alerts"""
         try:
             logger.info("Updating crypto prices...")
             prices = price_scraper.get_crypto_prices()
+            self._crypto_count = len(prices)
             
             if prices:
                 # Log prices
-                logged_count = data_logger.log_prices(prices)
-                logger.info(f"Logged {logged_count} crypto price entries")
+                logged_count = self.data_logger.log_prices(prices)
+                logger.info("Logged %d crypto price entries", logged_count)
                 
                 # Process alerts
                 alert_system.process_alerts(prices)
@@ -140,18 +171,19 @@ class PriceTracker:
                 logger.warning("No crypto prices received")
                 
         except Exception as e:
-            logger.error(f"Error updating crypto prices: {e}")
+            logger.error("Error updating crypto prices: %s", e)
     
     def _update_stock_prices(self):
         """Update stock prices and process alerts"""
         try:
             logger.info("Updating stock prices...")
             prices = price_scraper.get_stock_prices()
+            self._stock_count = len(prices)
             
             if prices:
                 # Log prices
-                logged_count = data_logger.log_prices(prices)
-                logger.info(f"Logged {logged_count} stock price entries")
+                logged_count = self.data_logger.log_prices(prices)
+                logger.info("Logged %d stock price entries", logged_count)
                 
                 # Process alerts
                 alert_system.process_alerts(prices)
@@ -160,16 +192,16 @@ class PriceTracker:
                 logger.warning("No stock prices received")
                 
         except Exception as e:
-            logger.error(f"Error updating stock prices: {e}")
+            logger.error("Error updating stock prices: %s", e)
     
     def _cleanup_old_data(self):
         """Clean up old data to prevent database bloat"""
         try:
             logger.info("Running data cleanup...")
-            data_logger.cleanup_old_data(days=30)
+            self.data_logger.cleanup_old_data(days=30)
             logger.info("Data cleanup completed")
         except Exception as e:
-            logger.error(f"Error during data cleanup: {e}")
+            logger.error("Error during data cleanup: %s", e)
     
     def stop(self):
         """Stop the price tracker application"""
@@ -180,33 +212,35 @@ class PriceTracker:
                 self.scheduler.shutdown()
                 logger.info("Background scheduler stopped")
             
+            alert_system.close()
+            price_scraper.close()
+            self.data_logger.close()
+            
             self.running = False
             logger.info("Price tracker stopped successfully!")
             
         except Exception as e:
-            logger.error(f"Error stopping price tracker: {e}")
+            logger.error("Error stopping price tracker: %s", e)
     
     def get_status(self):
         """Get current application status"""
         try:
-            # Get component status
-            crypto_prices = price_scraper.get_crypto_prices()
-            stock_prices = price_scraper.get_stock_prices()
+            # Get component status; asset counts come from the last scheduled updates
             alert_stats = alert_system.get_alert_stats()
-            db_stats = data_logger.get_summary_stats()
+            db_stats = self.data_logger.get_summary_stats()
             
             return {
                 'running': self.running,
                 'scheduler_running': self.scheduler.running,
-                'crypto_assets_tracked': len(crypto_prices),
-                'stock_assets_tracked': len(stock_prices),
+                'crypto_assets_tracked': self._crypto_count,
+                'stock_assets_tracked': self._stock_count,
                 'alert_stats': alert_stats,
                 'database_stats': db_stats,
                 'last_update': datetime.now().isoformat()
             }
             
         except Exception as e:
-            logger.error(f"Error getting status: {e}")
+            logger.error("Error getting status: %s", e)
             return {'error': str(e)}
 
 def main():
@@ -225,7 +259,7 @@ def main():
         logger.info("Received interrupt signal, shutting down...")
         tracker.stop()
     except Exception as e:
-        logger.error(f"Unexpected error: {e}")
+        logger.error("Unexpected error: %s", e)
         tracker.stop()
         raise
 
@@ -4,50 +4,153 @@ Fetches real-time prices from CoinGecko (crypto) and Yahoo Finance (stocks)
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import yfinance as yf
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import time
 import logging
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
 import config
+from security_config import SecurityConfig
 
 # Set up logging
 logging.basicConfig(level=getattr(logging, config.LOG_LEVEL), format=config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+# /coins/{id} sections get_asset_info doesn't use; leaving them out shrinks the payload ~10x.
+# With localization off the description still carries the English text.
+COIN_DETAIL_PARAMS = {
+    'localization': 'false',
+    'tickers': 'false',
+    'market_data': 'true',
+    'community_data': 'false',
+    'developer_data': 'false',
+    'sparkline': 'false'
+}
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Required price fields in CoinGecko and yfinance responses
+COIN_PRICE_FIELD = 'usd'
+STOCK_PRICE_FIELD = 'regularMarketPrice'
+
+def _make_session() -> requests.Session:
+    """Create the HTTP session with a connection pool sized for concurrent fetches"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=20,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.3,
+            status_forcelist=[429, 500, 502, 503, 504]
+        )
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(REQUEST_HEADERS)
+    return session
+
+# Shared by every PriceScraper so the connection pool stays warm for the process lifetime
+_SESSION = _make_session()
+
+# yf.download resets and reads back module-level result dicts in yfinance.shared,
+# so overlapping calls (dashboard threads and the scheduler) would clobber each other
+_YF_DOWNLOAD_LOCK = threading.Lock()
+
+@lru_cache(maxsize=32)
+def _clean_symbols(symbols: tuple) -> tuple:
+    """Strip, lowercase and pattern-check symbols, dropping any that are invalid"""
+    _strip = str.strip
+    _lower = str.lower
+    match = SecurityConfig.SYMBOL_PATTERN.match
+    max_len = SecurityConfig.MAX_SYMBOL_LENGTH
+    return tuple(
+        clean for s in symbols
+        if isinstance(s, str) and (clean := _lower(_strip(s))) and len(clean) <= max_len and match(clean)
+    )
+
+@lru_cache(maxsize=4)
+def _configured_crypto_ids(assets: tuple) -> Tuple[tuple, str, frozenset]:
+    """Cleaned ids, comma-joined 'ids' parameter and result cache key for the configured assets"""
+    symbols = _clean_symbols(assets)
+    return symbols, ','.join(symbols), frozenset(symbols)
+
 class PriceScraper:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        self.last_request_time = 0
-        self.rate_limit_delay = 60 / config.COINGECKO_RATE_LIMIT  # seconds between requests
+        self.session = _SESSION
+        
+        # Token bucket shared by all threads: up to COINGECKO_RATE_LIMIT requests per minute
+        self._bucket_capacity = float(config.COINGECKO_RATE_LIMIT)
+        self._bucket_rate = config.COINGECKO_RATE_LIMIT / 60  # tokens refilled per second
+        self._bucket_tokens = self._bucket_capacity
+        self._bucket_ts = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        
+        # Recent results keyed by symbol set: frozenset -> (monotonic fetch time, results)
+        self._crypto_cache: Dict[frozenset, Tuple[float, Dict]] = {}
+        self._stock_cache: Dict[frozenset, Tuple[float, Dict]] = {}
+        self._cache_lock = threading.Lock()
         
     def _rate_limit(self):
         """Implement rate limiting for CoinGecko API"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit_delay:
-            sleep_time = self.rate_limit_delay - time_since_last
-            time.sleep(sleep_time)
-        self.last_request_time = time.time()
+        with self._bucket_lock:
+            now = time.monotonic()
+            self._bucket_tokens = min(
+                self._bucket_capacity,
+                self._bucket_tokens + (now - self._bucket_ts) * self._bucket_rate
+            )
+            self._bucket_ts = now
+            
+            # Reserve a token; a negative balance is the wait owed before it refills
+            self._bucket_tokens -= 1
+            wait = -self._bucket_tokens / self._bucket_rate if self._bucket_tokens < 0 else 0
+        
+        # Sleep outside the lock so other callers can take tokens meanwhile
+        if wait > 0:
+            time.sleep(wait)
+    
+    def _get_cached(self, cache: Dict, key: frozenset) -> Optional[Dict]:
+        """Return cached results for key if they are younger than PRICE_TTL_SECONDS"""
+        with self._cache_lock:
+            entry = cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < config.PRICE_TTL_SECONDS:
+            return entry[1]
+        return None
+    
+    def _store_cached(self, cache: Dict, key: frozenset, results: Dict):
+        """Remember results for key; empty (failed) fetches are not cached"""
+        if results:
+            with self._cache_lock:
+                cache[key] = (time.monotonic(), results)
+    
+    def clear_cache(self):
+        """Drop all cached price results so the next call fetches fresh data"""
+        with self._cache_lock:
+            self._crypto_cache.clear()
+            self._stock_cache.clear()
     
     def _validate_symbols(self, symbols: List[str]) -> List[str]:
         """Validate and clean symbol list"""
         if not symbols:
             return []
         
-        valid_symbols = []
-        for symbol in symbols:
-            if symbol and isinstance(symbol, str):
-                # Clean and validate symbol
-                clean_symbol = symbol.strip().lower()
-                if clean_symbol and len(clean_symbol) <= 50:  # Reasonable length limit
-                    valid_symbols.append(clean_symbol)
-        
-        return valid_symbols
+        try:
+            # Configured asset lists never change at runtime, so their cleaned form is memoized
+            return list(_clean_symbols(tuple(symbols)))
+        except TypeError:
+            # Unhashable entries can't be valid symbols; clean without the cache
+            return list(_clean_symbols.__wrapped__(symbols))
     
     def get_crypto_prices(self, symbols: Optional[List[str]] = None) -> Dict:
         """
@@ -60,13 +163,21 @@ class PriceScraper:
             Dict with price data for each asset
         """
         if symbols is None:
-            symbols = config.CRYPTO_ASSETS
+            # Common path: the configured ids, their joined form and cache key are memoized
+            symbols, ids_param, cache_key = _configured_crypto_ids(tuple(config.CRYPTO_ASSETS))
+        else:
+            # Validate and clean symbols
+            symbols = self._validate_symbols(symbols)
+            ids_param = ','.join(symbols)
+            cache_key = frozenset(symbols)
         
-        # Validate and clean symbols
-        symbols = self._validate_symbols(symbols)
         if not symbols:
             logger.warning("No valid crypto symbols provided")
             return {}
+        
+        cached = self._get_cached(self._crypto_cache, cache_key)
+        if cached is not None:
+            return cached
             
         try:
             self._rate_limit()
@@ -74,7 +185,7 @@ class PriceScraper:
             # CoinGecko API endpoint for multiple coins
             url = f"{config.COINGECKO_API_URL}/simple/price"
             params = {
-                'ids': ','.join(symbols),
+                'ids': ids_param,
                 'vs_currencies': 'usd',
                 'include_24hr_change': 'true',
                 'include_last_updated_at': 'true'
@@ -82,7 +193,7 @@ class PriceScraper:
             
             response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             
             results = {}
             timestamp = datetime.now()
@@ -106,6 +217,7 @@ class PriceScraper:
                     logger.warning(f"No data found for crypto symbol: {symbol}")
                     
             logger.info(f"Successfully fetched prices for {len(results)} crypto assets")
+            self._store_cached(self._crypto_cache, cache_key, results)
             return results
             
         except requests.exceptions.RequestException as e:
@@ -118,17 +230,11 @@ class PriceScraper:
     def _validate_coin_data(self, coin_data: Dict) -> bool:
         """Validate coin data from API response"""
         try:
-            if not isinstance(coin_data, dict):
-                return False
-            
-            # Check for required fields
-            required_fields = ['usd']
-            for field in required_fields:
-                if field not in coin_data:
-                    return False
+            # The price is the only required field; a missing key or non-dict
+            # raises here and is rejected by the handler below
+            price = coin_data[COIN_PRICE_FIELD]
             
             # Validate price is numeric and positive
-            price = coin_data.get('usd')
             if not isinstance(price, (int, float)) or price <= 0:
                 return False
             
@@ -159,65 +265,150 @@ class PriceScraper:
         if not symbols:
             logger.warning("No valid stock symbols provided")
             return {}
+        
+        cache_key = frozenset(symbols)
+        cached = self._get_cached(self._stock_cache, cache_key)
+        if cached is not None:
+            return cached
             
-        results = {}
         timestamp = datetime.now()
         
         try:
-            # Fetch data for all symbols at once
-            tickers = yf.Tickers(' '.join(symbols))
+            # One batched download covers every symbol that has recent daily closes
+            batched = self._fetch_stock_batch(symbols, timestamp)
+            missing = [symbol for symbol in symbols if symbol not in batched]
             
+            # Fall back to per-symbol .info lookups, fetched concurrently, for the rest
+            fetched = {}
+            if missing:
+                max_workers = min(config.STOCK_FETCH_WORKERS, len(missing))
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    fetched = dict(executor.map(self._fetch_one_stock, missing, repeat(timestamp)))
+            
+            # Keep the result dict in configured symbol order
+            results = {}
             for symbol in symbols:
-                try:
-                    ticker = tickers.tickers[symbol]
-                    info = ticker.info
-                    
-                    # Validate stock data
-                    if self._validate_stock_data(info):
-                        # Get current price and 24h change
-                        current_price = info.get('regularMarketPrice', 0)
-                        previous_close = info.get('regularMarketPreviousClose', current_price)
-                        
-                        if previous_close and current_price:
-                            change_24h = ((current_price - previous_close) / previous_close) * 100
-                        else:
-                            change_24h = 0
-                        
-                        results[symbol] = {
-                            'symbol': symbol,
-                            'price': current_price,
-                            'change_24h': change_24h,
-                            'timestamp': timestamp,
-                            'type': 'stock'
-                        }
-                    else:
-                        logger.warning(f"Invalid data received for stock symbol: {symbol}")
-                        
-                except Exception as e:
-                    logger.warning(f"Error fetching data for stock {symbol}: {e}")
-                    continue
+                record = batched.get(symbol) or fetched.get(symbol)
+                if record is not None:
+                    results[symbol] = record
                     
             logger.info(f"Successfully fetched prices for {len(results)} stock assets")
+            self._store_cached(self._stock_cache, cache_key, results)
             return results
             
         except Exception as e:
             logger.error(f"Error fetching stock prices: {e}")
             return {}
     
+    def _fetch_stock_batch(self, symbols: List[str], timestamp: datetime) -> Dict:
+        """
+        Fetch prices for many stocks with a single batched yfinance download
+        
+        Args:
+            symbols: Cleaned (lowercase) stock symbols
+            timestamp: Timestamp to stamp on each record
+            
+        Returns:
+            Dict of records for the symbols that had two valid daily closes
+        """
+        tickers = [symbol.upper() for symbol in symbols]
+        try:
+            with _YF_DOWNLOAD_LOCK:
+                df = yf.download(
+                    tickers, period='2d', interval='1d', group_by='ticker',
+                    threads=True, progress=False, auto_adjust=False
+                )
+        except Exception as e:
+            logger.warning(f"Batched stock download failed: {e}")
+            return {}
+        
+        if df is None or df.empty:
+            return {}
+        
+        try:
+            if isinstance(df.columns, pd.MultiIndex):
+                closes = df.xs('Close', axis=1, level=1)
+            else:
+                # Older yfinance versions return flat columns for a single ticker
+                closes = df[['Close']].set_axis(tickers[:1], axis=1)
+        except KeyError:
+            return {}
+        
+        if len(closes) < 2:
+            return {}
+        
+        # Compute every change in one vectorized pass over the last two closes
+        last = closes.iloc[-1].to_numpy(dtype=np.float64)
+        prev = closes.iloc[-2].to_numpy(dtype=np.float64)
+        valid = np.isfinite(last) & np.isfinite(prev) & (last > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change = np.where(prev > 0, (last - prev) / prev * 100.0, 0.0)
+        
+        # Map the frame's ticker columns back to the cleaned symbols
+        symbol_for = dict(zip(tickers, symbols))
+        results = {}
+        for ticker, price, change_24h, ok in zip(closes.columns, last.tolist(), change.tolist(), valid.tolist()):
+            symbol = symbol_for.get(ticker)
+            if symbol is None or not ok:
+                continue
+            results[symbol] = {
+                'symbol': symbol,
+                'price': price,
+                'change_24h': change_24h,
+                'timestamp': timestamp,
+                'type': 'stock'
+            }
+        
+        return results
+    
+    def _fetch_one_stock(self, symbol: str, timestamp: datetime) -> Tuple[str, Optional[Dict]]:
+        """
+        Fetch and validate the price record for a single stock
+        
+        Args:
+            symbol: Stock symbol
+            timestamp: Timestamp to stamp on the record
+            
+        Returns:
+            (symbol, record) tuple, with record None if the fetch or validation failed
+        """
+        try:
+            info = yf.Ticker(symbol).info
+            
+            # Validate stock data
+            if not self._validate_stock_data(info):
+                logger.warning(f"Invalid data received for stock symbol: {symbol}")
+                return symbol, None
+            
+            # Get current price and 24h change
+            current_price = info.get('regularMarketPrice', 0)
+            previous_close = info.get('regularMarketPreviousClose', current_price)
+            
+            if previous_close and current_price:
+                change_24h = ((current_price - previous_close) / previous_close) * 100
+            else:
+                change_24h = 0
+            
+            return symbol, {
+                'symbol': symbol,
+                'price': current_price,
+                'change_24h': change_24h,
+                'timestamp': timestamp,
+                'type': 'stock'
+            }
+            
+        except Exception as e:
+            logger.warning(f"Error fetching data for stock {symbol}: {e}")
+            return symbol, None
+    
     def _validate_stock_data(self, stock_data: Dict) -> bool:
         """Validate stock data from yfinance"""
         try:
-            if not isinstance(stock_data, dict):
-                return False
-            
-            # Check for required fields
-            required_fields = ['regularMarketPrice']
-            for field in required_fields:
-                if field not in stock_data:
-                    return False
+            # The price is the only required field; a missing key or non-dict
+            # raises here and is rejected by the handler below
+            price = stock_data[STOCK_PRICE_FIELD]
             
             # Validate price is numeric and positive
-            price = stock_data.get('regularMarketPrice')
             if not isinstance(price, (int, float)) or price <= 0:
                 return False
             
@@ -232,8 +423,12 @@ class PriceScraper:
         Returns:
             Combined dict with all asset prices
         """
-        crypto_prices = self.get_crypto_prices()
-        stock_prices = self.get_stock_prices()
+        # The two sources are independent, so fetch them at the same time
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            crypto_future = executor.submit(self.get_crypto_prices)
+            stock_future = executor.submit(self.get_stock_prices)
+            crypto_prices = crypto_future.result()
+            stock_prices = stock_future.result()
         
         # Combine results
         all_prices = {**crypto_prices, **stock_prices}
@@ -241,6 +436,64 @@ class PriceScraper:
         logger.info(f"Total assets tracked: {len(all_prices)}")
         return all_prices
     
+    def close(self):
+        """Close the pooled keep-alive connections held by the shared HTTP session"""
+        self.session.close()
+    
+    def get_assets_info_batch(self, symbols: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+        Get market information for many crypto assets with batched /coins/markets calls
+        
+        Args:
+            symbols: List of CoinGecko coin ids (defaults to the configured crypto assets)
+            
+        Returns:
+            Dict keyed by coin id with the same market fields as get_asset_info
+            (the long description is only available from get_asset_info)
+        """
+        if symbols is None:
+            symbols = config.CRYPTO_ASSETS
+        
+        symbols = self._validate_symbols(symbols)
+        if not symbols:
+            return {}
+        
+        url = f"{config.COINGECKO_API_URL}/coins/markets"
+        results = {}
+        
+        try:
+            # One request (and one rate limit token) per page of up to COINGECKO_MARKETS_PAGE_SIZE ids
+            page_size = config.COINGECKO_MARKETS_PAGE_SIZE
+            for start in range(0, len(symbols), page_size):
+                page = symbols[start:start + page_size]
+                self._rate_limit()
+                response = self.session.get(url, params={
+                    'vs_currency': 'usd',
+                    'ids': ','.join(page),
+                    'per_page': page_size
+                }, timeout=15)
+                response.raise_for_status()
+                
+                for coin in orjson.loads(response.content):
+                    coin_id = coin.get('id')
+                    if not coin_id:
+                        continue
+                    results[coin_id] = {
+                        'name': coin.get('name') or coin_id,
+                        'symbol': (coin.get('symbol') or coin_id).upper(),
+                        'market_cap': coin.get('market_cap') or 0,
+                        'volume_24h': coin.get('total_volume') or 0,
+                        'circulating_supply': coin.get('circulating_supply') or 0,
+                        'max_supply': coin.get('max_supply') or 0,
+                        'image': coin.get('image') or ''
+                    }
+            
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error fetching batched asset info: {e}")
+            return results
+    
     def get_asset_info(self, symbol: str, asset_type: str = 'crypto') -> Optional[Dict]:
         """
         Get detailed information about a specific asset
@@ -263,9 +516,9 @@ class PriceScraper:
             if asset_type == 'crypto':
                 self._rate_limit()
                 url = f"{config.COINGECKO_API_URL}/coins/{symbol}"
-                response = self.session.get(url, timeout=15)
+                response = self.session.get(url, params=COIN_DETAIL_PARAMS, timeout=15)
                 response.raise_for_status()
-                data = response.json()
+                data = orjson.loads(response.content)
                 
                 return {
                     'name': data.get('name', symbol),
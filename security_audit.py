@@ -7,6 +7,8 @@ import os
 import sys
 import sqlite3
 import logging
+import re
+from importlib.metadata import version, PackageNotFoundError
 from pathlib import Path
 from typing import Dict, List, Tuple
 import config
@@ -16,6 +18,19 @@ import security_config
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# (distribution name, display name, minimum version without known vulnerabilities)
+MINIMUM_VERSIONS = (
+    ('requests', 'requests', '2.31.0'),
+    ('flask', 'Flask', '3.0.0'),
+)
+
+_RELEASE_PATTERN = re.compile(r'\d+(?:\.\d+)*')
+
+def _version_tuple(version_string: str) -> Tuple[int, ...]:
+    """Numeric release components of a version string, e.g. '3.0.2rc1' -> (3, 0, 2)"""
+    match = _RELEASE_PATTERN.match(version_string)
+    return tuple(int(part) for part in match.group().split('.')) if match else ()
+
 class SecurityAuditor:
     """Security audit utility for the application"""
     
@@ -23,6 +38,7 @@ class SecurityAuditor:
         self.issues = []
         self.warnings = []
         self.recommendations = []
+        self._table_count = None  # Cached after the first database check
     
     def run_full_audit(self) -> Dict[str, List[str]]:
         """Run complete security audit"""
@@ -52,11 +68,25 @@ class SecurityAuditor:
             'logs/price_logs.csv'
         ]
         
+        # One scandir per parent directory instead of an exists() + stat() pair per file
+        files_by_dir = {}
         for file_path in critical_files:
-            if os.path.exists(file_path):
+            parent, name = os.path.split(file_path)
+            files_by_dir.setdefault(parent or '.', []).append((file_path, name))
+        
+        for parent, files in files_by_dir.items():
+            try:
+                with os.scandir(parent) as it:
+                    entries = {entry.name: entry for entry in it}
+            except OSError:
+                continue  # Directory doesn't exist yet
+            
+            for file_path, name in files:
+                entry = entries.get(name)
+                if entry is None:
+                    continue
                 try:
-                    stat = os.stat(file_path)
-                    mode = stat.st_mode & 0o777
+                    mode = entry.stat().st_mode & 0o777
                     
                     if mode != 0o600:
                         self.issues.append(f"File {file_path} has insecure permissions: {oct(mode)}")
@@ -74,26 +104,32 @@ class SecurityAuditor:
         db_path = config.DATABASE_PATH
         if os.path.exists(db_path):
             try:
-                # Check if database is accessible
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                
-                # Check for SQL injection vulnerabilities
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-                tables = cursor.fetchall()
+                table_count = self._get_table_count(db_path)
                 
-                if not tables:
+                if not table_count:
                     self.warnings.append("Database appears to be empty")
                 else:
-                    logger.info(f"✓ Database contains {len(tables)} tables")
-                
-                conn.close()
+                    logger.info(f"✓ Database contains {table_count} tables")
                 
             except Exception as e:
                 self.issues.append(f"Database security issue: {e}")
         else:
             logger.info("Database file does not exist yet (normal for first run)")
     
+    def _get_table_count(self, db_path: str) -> int:
+        """Count database tables over a read-only connection, once per auditor"""
+        if self._table_count is None:
+            # Read-only URI mode: the audit never writes and skips journal setup
+            uri = Path(db_path).resolve().as_uri() + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True)
+            try:
+                self._table_count = conn.execute(
+                    "SELECT COUNT(*) FROM sqlite_master WHERE type='table'"
+                ).fetchone()[0]
+            finally:
+                conn.close()
+        return self._table_count
+    
     def _check_configuration_security(self):
         """Check configuration security"""
         logger.info("Checking configuration security...")
@@ -123,23 +159,18 @@ class SecurityAuditor:
         """Check dependency security"""
         logger.info("Checking dependencies...")
         
-        try:
-            import requests
-            if requests.__version__ < "2.31.0":
-                self.warnings.append(f"requests version {requests.__version__} may have security vulnerabilities")
-            else:
-                logger.info(f"✓ requests version {requests.__version__} is up to date")
-        except ImportError:
-            self.issues.append("requests library not found")
-        
-        try:
-            import flask
-            if flask.__version__ < "3.0.0":
-                self.warnings.append(f"Flask version {flask.__version__} may have security vulnerabilities")
+        # Read versions from installed package metadata instead of importing the packages
+        for package, display_name, minimum in MINIMUM_VERSIONS:
+            try:
+                installed = version(package)
+            except PackageNotFoundError:
+                self.issues.append(f"{display_name} library not found")
+                continue
+            
+            if _version_tuple(installed) < _version_tuple(minimum):
+                self.warnings.append(f"{display_name} version {installed} may have security vulnerabilities")
             else:
-                logger.info(f"✓ Flask version {flask.__version__} is up to date")
-        except ImportError:
-            self.issues.append("Flask library not found")
+                logger.info(f"✓ {display_name} version {installed} is up to date")
     
     def _check_environment_variables(self):
         """Check environment variable security"""
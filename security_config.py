@@ -5,11 +5,23 @@ Centralized security settings and validation functions
 
 import os
 import re
-from typing import Optional, Dict, Any
+import numpy as np
+from itertools import compress
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Mapping, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Built once at import; the same read-only mapping is returned for every response
+SECURITY_HEADERS = MappingProxyType({
+    'X-Content-Type-Options': 'nosniff',
+    'X-Frame-Options': 'DENY',
+    'X-XSS-Protection': '1; mode=block',
+    'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
+    'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline' cdn.jsdelivr.net cdnjs.cloudflare.com; style-src 'self' 'unsafe-inline' cdn.jsdelivr.net cdnjs.cloudflare.com; img-src 'self' data:; font-src 'self' cdnjs.cloudflare.com;"
+})
+
 class SecurityConfig:
     """Security configuration and validation utilities"""
     
@@ -19,6 +31,7 @@ class SecurityConfig:
     MAX_CHANGE_PERCENT = 1000  # 1000% max change
     MIN_PASSWORD_LENGTH = 8
     MAX_REQUEST_SIZE = 1024 * 1024  # 1MB max request size
+    REQUIRED_PRICE_FIELDS = frozenset(('price', 'change_24h', 'type'))
     
     # Rate limiting
     RATE_LIMIT_ENABLED = True
@@ -30,6 +43,9 @@ class SecurityConfig:
     EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
     URL_PATTERN = re.compile(r'^https?://[^\s/$.?#].[^\s]*$')
     
+    # Translation table that deletes characters stripped by sanitize_input
+    SANITIZE_TABLE = str.maketrans('', '', '<>"\'')
+    
     @staticmethod
     def validate_symbol(symbol: str) -> bool:
         """Validate asset symbol"""
@@ -46,61 +62,79 @@ class SecurityConfig:
         
         return True
     
+    @staticmethod
+    def _is_number(value: Any) -> bool:
+        """True for ints and floats (including float subclasses such as np.float64), never bools"""
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    
     @staticmethod
     def validate_price(price: Any) -> bool:
         """Validate price value"""
-        try:
-            if not isinstance(price, (int, float)):
-                return False
-            
-            if price <= 0 or price > SecurityConfig.MAX_PRICE_VALUE:
-                return False
-            
-            return True
-        except Exception:
-            return False
+        # NaN fails the range comparison; NumPy integer types are not ints and are rejected
+        return SecurityConfig._is_number(price) and 0 < price <= SecurityConfig.MAX_PRICE_VALUE
     
     @staticmethod
     def validate_change_percent(change: Any) -> bool:
         """Validate percentage change"""
-        try:
-            if not isinstance(change, (int, float)):
-                return False
-            
-            if abs(change) > SecurityConfig.MAX_CHANGE_PERCENT:
-                return False
-            
-            return True
-        except Exception:
-            return False
+        max_change = SecurityConfig.MAX_CHANGE_PERCENT
+        return SecurityConfig._is_number(change) and -max_change <= change <= max_change
+    
+    @staticmethod
+    def _has_price_fields(symbol: str, price_data: Dict) -> bool:
+        """Structure and type checks of validate_price_data, without the numeric ranges"""
+        return (
+            isinstance(symbol, str) and bool(symbol)
+            and isinstance(price_data, dict)
+            and SecurityConfig.REQUIRED_PRICE_FIELDS.issubset(price_data)
+            and SecurityConfig._is_number(price_data['price'])
+            and SecurityConfig._is_number(price_data['change_24h'])
+            and price_data['type'] in ('crypto', 'stock')
+        )
     
     @staticmethod
     def validate_price_data(symbol: str, price_data: Dict) -> bool:
         """Centralized price data validation"""
-        try:
-            if not symbol or not isinstance(symbol, str):
-                return False
-                
-            required_fields = ['price', 'change_24h', 'type']
-            for field in required_fields:
-                if field not in price_data:
-                    return False
-            
-            # Validate price is numeric and positive
-            if not SecurityConfig.validate_price(price_data['price']):
-                return False
-            
-            # Validate change_24h is numeric
-            if not SecurityConfig.validate_change_percent(price_data['change_24h']):
-                return False
-            
-            # Validate asset type
-            if price_data['type'] not in ['crypto', 'stock']:
-                return False
+        return (
+            SecurityConfig._has_price_fields(symbol, price_data)
+            and SecurityConfig.validate_price(price_data['price'])
+            and SecurityConfig.validate_change_percent(price_data['change_24h'])
+        )
+    
+    @staticmethod
+    def validate_price_batch(prices: Dict) -> List[Tuple[str, Dict]]:
+        """
+        Apply validate_price_data to a whole tick of prices at once
+        
+        Structure and types are checked per symbol; the price and change ranges
+        run once over the batch as NumPy arrays, using the same comparisons as
+        validate_price and validate_change_percent.
+        
+        Args:
+            prices: Dict of symbol -> price data
             
-            return True
-        except Exception:
-            return False
+        Returns:
+            List of (symbol, price_data) pairs that passed validation, in input order
+        """
+        candidates = [
+            (symbol, price_data) for symbol, price_data in prices.items()
+            if SecurityConfig._has_price_fields(symbol, price_data)
+        ]
+        if not candidates:
+            return []
+        
+        count = len(candidates)
+        price_arr = np.fromiter((d['price'] for _, d in candidates), dtype=np.float64, count=count)
+        change_arr = np.fromiter((d['change_24h'] for _, d in candidates), dtype=np.float64, count=count)
+        
+        max_change = SecurityConfig.MAX_CHANGE_PERCENT
+        mask = (
+            (price_arr > 0) & (price_arr <= SecurityConfig.MAX_PRICE_VALUE)
+            & (change_arr >= -max_change) & (change_arr <= max_change)
+        )
+        
+        if mask.all():
+            return candidates
+        return list(compress(candidates, mask))
     
     @staticmethod
     def validate_email(email: str) -> bool:
@@ -108,6 +142,10 @@ class SecurityConfig:
         if not email or not isinstance(email, str):
             return False
         
+        # Cheap invariants reject most bad input before running the regex
+        if '@' not in email or '.' not in email:
+            return False
+        
         return bool(SecurityConfig.EMAIL_PATTERN.match(email))
     
     @staticmethod
@@ -116,6 +154,10 @@ class SecurityConfig:
         if not url or not isinstance(url, str):
             return False
         
+        # Cheap invariant rejects most bad input before running the regex
+        if not url.startswith(('http://', 'https://')):
+            return False
+        
         return bool(SecurityConfig.URL_PATTERN.match(url))
     
     @staticmethod
@@ -125,8 +167,7 @@ class SecurityConfig:
             return ""
         
         # Remove potentially dangerous characters
-        sanitized = re.sub(r'[<>"\']', '', input_str)
-        return sanitized.strip()
+        return input_str.translate(SecurityConfig.SANITIZE_TABLE).strip()
     
     @staticmethod
     def validate_configuration() -> Dict[str, bool]:
@@ -158,12 +199,6 @@ class SecurityConfig:
         return issues
     
     @staticmethod
-    def get_security_headers() -> Dict[str, str]:
-        """Get security headers for web responses"""
-        return {
-            'X-Content-Type-Options': 'nosniff',
-            'X-Frame-Options': 'DENY',
-            'X-XSS-Protection': '1; mode=block',
-            'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
-            'Content-Security-Policy': "default-src 'self'; script-src 'self' 'unsafe-inline' cdn.jsdelivr.net cdnjs.cloudflare.com; style-src 'self' 'unsafe-inline' cdn.jsdelivr.net cdnjs.cloudflare.com; img-src 'self' data:; font-src 'self' cdnjs.cloudflare.com;"
-        } 
\ No newline at end of file
+    def get_security_headers() -> Mapping[str, str]:
+        """Get security headers for web responses (read-only; copy with dict() to modify)"""
+        return SECURITY_HEADERS 
\ No newline at end of file
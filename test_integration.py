@@ -1,238 +1,353 @@
 """
-Integration Test Script for Crypto/Stock Price Tracker
+Integration Tests for Crypto/Stock Price Tracker
 Tests all components work together properly
+
+Run with: python -m pytest test_integration.py (or python test_integration.py)
 """
 
+import os
 import sys
 import logging
+import threading
+import time
+import importlib.util
+from collections import OrderedDict
 from datetime import datetime
+from unittest import mock
+import numpy as np
+import orjson
+import pandas as pd
+import pytest
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Set up logging; progress lines are INFO, so CI stays quiet unless TEST_LOG_LEVEL=INFO
+TEST_LOG_LEVEL = os.environ.get("TEST_LOG_LEVEL", "WARNING").upper()
+logging.basicConfig(level=TEST_LOG_LEVEL, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
+logger.setLevel(TEST_LOG_LEVEL)  # basicConfig is a no-op when pytest already configured logging
+
+# Import every component once; test_imports reports the outcome
+try:
+    import config
+    from security_config import SecurityConfig
+    from price_scraper import price_scraper
+    from data_logger import DataLogger, get_data_logger
+    from alert_system import alert_system
+    from security_audit import SecurityAuditor
+    IMPORT_OK = True
+    IMPORT_ERROR = None
+except Exception as e:
+    IMPORT_OK = False
+    IMPORT_ERROR = e
+
+# Every test except test_imports depends on the components above; when they failed
+# to import, test_imports reports the failure and the dependents are skipped
+requires_components = pytest.mark.skipif(not IMPORT_OK, reason="component imports failed")
+
+# Source files each test exercises; conftest.py's --skip-unchanged reruns a
+# previously passing test only when one of these (or this file) has changed
+TEST_DEPENDENCIES = {
+    "test_imports": ("config.py", "security_config.py", "price_scraper.py", "data_logger.py",
+                     "alert_system.py", "security_audit.py"),
+    "test_security_config": ("security_config.py",),
+    "test_price_batch_matches_price_data": ("security_config.py",),
+    "test_data_logger": ("config.py", "security_config.py", "data_logger.py"),
+    "test_data_logger_batch": ("config.py", "security_config.py", "data_logger.py"),
+    "test_data_logger_skips_duplicates": ("config.py", "security_config.py", "data_logger.py"),
+    "test_alert_system": ("config.py", "security_config.py", "alert_system.py"),
+    "test_price_scraper": ("config.py", "security_config.py", "price_scraper.py"),
+    "test_price_scraper_overlapping_stock_batches": ("config.py", "security_config.py", "price_scraper.py"),
+    "test_price_scraper_live": ("config.py", "security_config.py", "price_scraper.py"),
+    "test_security_audit": ("config.py", "security_config.py", "security_audit.py"),
+}
+
+# Files whose modification times decide whether a cached audit is still valid
+AUDIT_FINGERPRINT_FILES = ("security_config.py", "config.py", "security_audit.py")
+
+# pytest cache key holding {"fingerprint": [...], "results": {...}} from the last audit
+AUDIT_CACHE_KEY = "crypto_dashboard/security_audit"
+
+def _audit_fingerprint() -> list:
+    """Modification times of the files the security audit depends on"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return [os.path.getmtime(os.path.join(base_dir, p)) for p in AUDIT_FINGERPRINT_FILES]
+
+def _cached_audit(cache) -> dict:
+    """Run the full security audit, reusing the stored results while its sources are unchanged"""
+    fingerprint = _audit_fingerprint()
+    if cache is not None:  # None when the cacheprovider plugin is disabled
+        cached = cache.get(AUDIT_CACHE_KEY, None)
+        if cached is not None and cached.get("fingerprint") == fingerprint:
+            return cached["results"]
+    
+    results = SecurityAuditor().run_full_audit()
+    if cache is not None:
+        cache.set(AUDIT_CACHE_KEY, {"fingerprint": fingerprint, "results": results})
+    return results
 
 def test_imports():
     """Test that all modules can be imported"""
     logger.info("Testing imports...")
     
-    try:
-        import config
-        logger.info("✓ config imported successfully")
-    except Exception as e:
-        logger.error(f"✗ Failed to import config: {e}")
-        return False
+    assert IMPORT_OK, f"Failed to import modules: {IMPORT_ERROR}"
     
-    try:
-        import security_config
-        logger.info("✓ security_config imported successfully")
-    except Exception as e:
-        logger.error(f"✗ Failed to import security_config: {e}")
-        return False
-    
-    try:
-        from price_scraper import price_scraper
-        logger.info("✓ price_scraper imported successfully")
-    except Exception as e:
-        logger.error(f"✗ Failed to import price_scraper: {e}")
-        return False
-    
-    try:
-        from data_logger import data_logger
-        logger.info("✓ data_logger imported successfully")
-    except Exception as e:
-        logger.error(f"✗ Failed to import data_logger: {e}")
-        return False
-    
-    try:
-        from alert_system import alert_system
-        logger.info("✓ alert_system imported successfully")
-    except Exception as e:
-        logger.error(f"✗ Failed to import alert_system: {e}")
-        return False
+    logger.info("[OK] All modules imported successfully")
+
+# Sample price shared by the data logger and alert tests; the fixed timestamp keeps it deterministic
+_SAMPLE_TIMESTAMP = datetime(2024, 1, 1, 0, 0, 0)
+_SAMPLE_BTC = {
+    'symbol': 'bitcoin',
+    'price': 45000.0,
+    'change_24h': 2.5,
+    'timestamp': _SAMPLE_TIMESTAMP,
+    'type': 'crypto'
+}
+
+class FrozenDatetime(datetime):
+    """datetime whose now() always returns the sample timestamp"""
     
-    return True
+    @classmethod
+    def now(cls, tz=None):
+        return _SAMPLE_TIMESTAMP if tz is None else _SAMPLE_TIMESTAMP.replace(tzinfo=tz)
 
+# Modules whose records are stamped with datetime.now(). data_logger keeps the real
+# clock: it dedupes per minute against the persistent database, so a frozen clock
+# would turn every later run's rows into duplicates.
+FROZEN_CLOCK_MODULES = ("price_scraper", "alert_system")
+
+@pytest.fixture(autouse=True)
+def frozen_clock(monkeypatch):
+    """Stamp scraped prices and alerts with the fixed sample timestamp"""
+    if IMPORT_OK:
+        for module in FROZEN_CLOCK_MODULES:
+            monkeypatch.setattr(f"{module}.datetime", FrozenDatetime)
+
+# (input, expected result) cases for the SecurityConfig validators
+SYMBOL_CASES = [("bitcoin", True), ("", False), ("a" * 100, False)]
+PRICE_CASES = [(100.0, True), (-100.0, False), ("invalid", False)]
+CHANGE_CASES = [(5.0, True), (-5.0, True), (2000.0, False)]
+
+@requires_components
 def test_security_config():
     """Test security configuration"""
     logger.info("Testing security configuration...")
     
-    try:
-        from security_config import SecurityConfig
-        
-        # Test symbol validation
-        assert SecurityConfig.validate_symbol("bitcoin") == True
-        assert SecurityConfig.validate_symbol("") == False
-        assert SecurityConfig.validate_symbol("a" * 100) == False
-        logger.info("✓ Symbol validation works")
-        
-        # Test price validation
-        assert SecurityConfig.validate_price(100.0) == True
-        assert SecurityConfig.validate_price(-100.0) == False
-        assert SecurityConfig.validate_price("invalid") == False
-        logger.info("✓ Price validation works")
-        
-        # Test change validation
-        assert SecurityConfig.validate_change_percent(5.0) == True
-        assert SecurityConfig.validate_change_percent(-5.0) == True
-        assert SecurityConfig.validate_change_percent(2000.0) == False
-        logger.info("✓ Change validation works")
-        
-        return True
-    except Exception as e:
-        logger.error(f"✗ Security config test failed: {e}")
-        return False
+    assert [s for s, e in SYMBOL_CASES if SecurityConfig.validate_symbol(s) is not e] == []
+    logger.info("[OK] Symbol validation works")
+    
+    assert [p for p, e in PRICE_CASES if SecurityConfig.validate_price(p) is not e] == []
+    logger.info("[OK] Price validation works")
+    
+    assert [c for c, e in CHANGE_CASES if SecurityConfig.validate_change_percent(c) is not e] == []
+    logger.info("[OK] Change validation works")
 
+# Price payloads on both sides of the validation rules; the batch and per-symbol checks must agree
+PRICE_DATA_CASES = {
+    'plain': {'price': 45000.0, 'change_24h': 2.5, 'type': 'crypto'},
+    'int_price': {'price': 150, 'change_24h': -1000, 'type': 'stock'},
+    'numpy_float': {'price': np.float64(45000.0), 'change_24h': 2.5, 'type': 'crypto'},
+    'dict_subclass': OrderedDict(price=45000.0, change_24h=2.5, type='crypto'),
+    'bool_price': {'price': True, 'change_24h': 2.5, 'type': 'crypto'},
+    'nan_price': {'price': float('nan'), 'change_24h': 2.5, 'type': 'crypto'},
+    'inf_change': {'price': 45000.0, 'change_24h': float('inf'), 'type': 'crypto'},
+    'too_expensive': {'price': 2e9, 'change_24h': 2.5, 'type': 'stock'},
+    'unknown_type': {'price': 45000.0, 'change_24h': 2.5, 'type': 'bond'},
+    'missing_field': {'price': 45000.0, 'change_24h': 2.5},
+    'not_a_dict': 45000.0,
+}
+
+@requires_components
+def test_price_batch_matches_price_data():
+    """Test that batch validation (data logger) and per-symbol validation (alerts) agree"""
+    logger.info("Testing batch price validation...")
+    
+    batch_valid = [symbol for symbol, _ in SecurityConfig.validate_price_batch(PRICE_DATA_CASES)]
+    single_valid = [s for s, d in PRICE_DATA_CASES.items() if SecurityConfig.validate_price_data(s, d)]
+    assert batch_valid == single_valid == ['plain', 'int_price', 'numpy_float', 'dict_subclass']
+    logger.info("[OK] Batch and per-symbol price validation agree")
+
+@requires_components
 def test_data_logger():
     """Test data logger functionality"""
     logger.info("Testing data logger...")
     
-    try:
-        from data_logger import data_logger
-        
-        # Test with sample data
-        test_prices = {
-            'bitcoin': {
-                'symbol': 'bitcoin',
-                'price': 45000.0,
-                'change_24h': 2.5,
-                'timestamp': datetime.now(),
-                'type': 'crypto'
-            }
-        }
-        
-        # Test logging
-        logged_count = data_logger.log_prices(test_prices)
-        logger.info(f"✓ Logged {logged_count} entries")
-        
-        # Test getting latest prices
-        latest = data_logger.get_latest_prices(5)
-        logger.info(f"✓ Retrieved {len(latest)} latest prices")
-        
-        # Test summary stats
-        stats = data_logger.get_summary_stats()
-        logger.info(f"✓ Got summary stats: {stats}")
-        
-        return True
-    except Exception as e:
-        logger.error(f"✗ Data logger test failed: {e}")
-        return False
+    data_logger = get_data_logger()
+    
+    # Test with sample data
+    test_prices = {'bitcoin': _SAMPLE_BTC}
+    
+    # Test logging
+    logged_count = data_logger.log_prices(test_prices)
+    logger.info("[OK] Logged %d entries", logged_count)
+    
+    # Test getting latest prices
+    latest = data_logger.get_latest_prices(5)
+    logger.info("[OK] Retrieved %d latest prices", len(latest))
+    
+    # Test summary stats
+    stats = data_logger.get_summary_stats()
+    logger.info("[OK] Got summary stats: %s", stats)
+
+BATCH_SIZE = 64
 
-def test_alert_system():
+@pytest.fixture
+def private_data_logger(tmp_path, monkeypatch):
+    """A DataLogger on its own database, so earlier runs can't turn rows into duplicates"""
+    monkeypatch.setattr(config, "DATABASE_PATH", str(tmp_path / "database" / "price_data.db"))
+    monkeypatch.setattr(config, "CSV_LOG_PATH", str(tmp_path / "logs" / "price_logs.csv"))
+    data_logger = DataLogger()
+    yield data_logger
+    data_logger.close()
+
+@requires_components
+def test_data_logger_batch(private_data_logger):
+    """Test that a whole batch of prices is logged in one call"""
+    logger.info("Testing batched data logging...")
+    
+    batch = {f"coin{i}": {**_SAMPLE_BTC, 'symbol': f"coin{i}"} for i in range(BATCH_SIZE)}
+    
+    # Each entry counts once for its SQLite row and once for its CSV row
+    logged_count = private_data_logger.log_prices(batch)
+    assert logged_count == 2 * BATCH_SIZE, f"logged {logged_count} of {2 * BATCH_SIZE} entries"
+    assert private_data_logger.get_summary_stats()['unique_assets'] == BATCH_SIZE
+    logger.info("[OK] Logged a batch of %d prices", BATCH_SIZE)
+
+@requires_components
+def test_data_logger_skips_duplicates(private_data_logger):
+    """Test that rows ignored by the unique index are not reported as inserted"""
+    logger.info("Testing duplicate detection...")
+    
+    entry = {'symbol': 'bitcoin', 'price': 45000.0, 'change_24h': 2.5, 'asset_type': 'crypto'}
+    other = {**entry, 'symbol': 'ethereum'}
+    epoch = int(_SAMPLE_TIMESTAMP.timestamp())
+    
+    assert private_data_logger._log_to_sqlite([entry], epoch) == [entry]
+    # Same epoch second: only the new symbol is inserted, not the existing bitcoin row
+    assert private_data_logger._log_to_sqlite([entry, other], epoch) == [other]
+    # Later in the same minute bucket: both are duplicates
+    assert private_data_logger._log_to_sqlite([entry, other], epoch + 30) == []
+    logger.info("[OK] Duplicates are skipped")
+
+@requires_components
+def test_alert_system(monkeypatch):
     """Test alert system functionality"""
     logger.info("Testing alert system...")
     
-    try:
-        from alert_system import alert_system
-        
-        # Test with sample data
-        test_prices = {
-            'bitcoin': {
-                'symbol': 'bitcoin',
-                'price': 45000.0,
-                'change_24h': 7.5,  # Above threshold
-                'timestamp': datetime.now(),
-                'type': 'crypto'
-            }
-        }
-        
-        # Test alert processing
-        alerts = alert_system.check_price_alerts(test_prices)
-        logger.info(f"✓ Found {len(alerts)} alerts")
-        
-        # Test stats
-        stats = alert_system.get_alert_stats()
-        logger.info(f"✓ Got alert stats: {stats}")
-        
-        return True
-    except Exception as e:
-        logger.error(f"✗ Alert system test failed: {e}")
-        return False
+    # Start with no cooldowns so the result doesn't depend on earlier alerts
+    monkeypatch.setattr(alert_system, "last_alerts", OrderedDict())
+    
+    # Test with sample data, moved above the alert threshold
+    test_prices = {'bitcoin': {**_SAMPLE_BTC, 'change_24h': 7.5}}
+    
+    # Test alert processing
+    alerts = alert_system.check_price_alerts(test_prices)
+    assert len(alerts) == 1
+    assert alerts[0]['symbol'] == 'bitcoin' and alerts[0]['timestamp'] == _SAMPLE_TIMESTAMP
+    
+    # The same move again is inside the cooldown window
+    assert alert_system.check_price_alerts(test_prices) == []
+    logger.info("[OK] Found %d alerts", len(alerts))
+    
+    # Test stats
+    stats = alert_system.get_alert_stats()
+    logger.info("[OK] Got alert stats: %s", stats)
+
+# Canned API responses so the default price scraper test never touches the network
+MOCK_COINGECKO_RESPONSE = {"bitcoin": {"usd": 45000.0, "usd_24h_change": 2.5}}
+MOCK_COINGECKO_BODY = orjson.dumps(MOCK_COINGECKO_RESPONSE)  # Serialized once at import
+MOCK_STOCK_CLOSES = {("AAPL", "Close"): [185.0, 190.0]}
 
+@requires_components
 def test_price_scraper():
-    """Test price scraper functionality"""
+    """Test price scraper functionality against mocked API responses"""
     logger.info("Testing price scraper...")
     
     try:
-        from price_scraper import price_scraper
+        price_scraper.clear_cache()
+        crypto_response = mock.MagicMock(content=MOCK_COINGECKO_BODY)
         
-        # Test crypto prices (this will make actual API calls)
-        crypto_prices = price_scraper.get_crypto_prices(['bitcoin'])
-        logger.info(f"✓ Retrieved {len(crypto_prices)} crypto prices")
+        with mock.patch.object(price_scraper.session, 'get', return_value=crypto_response) as mock_get, \
+                mock.patch('price_scraper.yf.download', return_value=pd.DataFrame(MOCK_STOCK_CLOSES)):
+            crypto_prices = price_scraper.get_crypto_prices(['bitcoin'])
+            stock_prices = price_scraper.get_stock_prices(['AAPL'])
         
-        # Test stock prices (this will make actual API calls)
-        stock_prices = price_scraper.get_stock_prices(['AAPL'])
-        logger.info(f"✓ Retrieved {len(stock_prices)} stock prices")
+        assert mock_get.call_count == 1
+        assert len(crypto_prices) == 1 and crypto_prices['bitcoin']['price'] == 45000.0
+        assert crypto_prices['bitcoin']['timestamp'] == _SAMPLE_TIMESTAMP
+        logger.info("[OK] Retrieved %d crypto prices", len(crypto_prices))
         
-        return True
-    except Exception as e:
-        logger.error(f"✗ Price scraper test failed: {e}")
-        return False
+        assert len(stock_prices) == 1 and stock_prices['aapl']['price'] == 190.0
+        assert stock_prices['aapl']['timestamp'] == _SAMPLE_TIMESTAMP
+        logger.info("[OK] Retrieved %d stock prices", len(stock_prices))
+    finally:
+        price_scraper.clear_cache()
 
-def test_security_audit():
-    """Test security audit functionality"""
-    logger.info("Testing security audit...")
+def _shared_state_download(shared: dict):
+    """Fake yf.download that, like yfinance, resets and reads back module-level results"""
+    def download(tickers, **kwargs):
+        shared.clear()
+        shared.update({(ticker, 'Close'): [100.0, 101.0] for ticker in tickers})
+        time.sleep(0.1)  # An overlapping call would reset shared here
+        return pd.DataFrame(dict(shared))
+    return download
+
+@requires_components
+def test_price_scraper_overlapping_stock_batches():
+    """Test that concurrent stock batch downloads don't clobber each other's results"""
+    logger.info("Testing overlapping stock downloads...")
+    
+    symbol_lists = (['AAPL', 'MSFT'], ['GOOGL', 'TSLA'])
+    results = [None, None]
+    
+    def fetch(index):
+        results[index] = price_scraper.get_stock_prices(symbol_lists[index])
     
     try:
-        from security_audit import SecurityAuditor
-        
-        auditor = SecurityAuditor()
-        results = auditor.run_full_audit()
-        
-        logger.info(f"✓ Security audit completed")
-        logger.info(f"  - Issues: {len(results['issues'])}")
-        logger.info(f"  - Warnings: {len(results['warnings'])}")
-        logger.info(f"  - Recommendations: {len(results['recommendations'])}")
+        price_scraper.clear_cache()
+        # Symbols missing from a batch would fall back to .info; make that fallback fail loudly
+        with mock.patch('price_scraper.yf.download', side_effect=_shared_state_download({})), \
+                mock.patch('price_scraper.yf.Ticker', side_effect=AssertionError("unexpected .info fallback")):
+            threads = [threading.Thread(target=fetch, args=(i,)) for i in range(len(symbol_lists))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
         
-        return True
-    except Exception as e:
-        logger.error(f"✗ Security audit test failed: {e}")
-        return False
-
-def main():
-    """Run all integration tests"""
-    logger.info("Starting integration tests...")
-    
-    tests = [
-        ("Imports", test_imports),
-        ("Security Config", test_security_config),
-        ("Data Logger", test_data_logger),
-        ("Alert System", test_alert_system),
-        ("Security Audit", test_security_audit),
-        ("Price Scraper", test_price_scraper),
-    ]
-    
-    passed = 0
-    failed = 0
-    
-    for test_name, test_func in tests:
-        logger.info(f"\n{'='*50}")
-        logger.info(f"Running {test_name} test...")
-        logger.info(f"{'='*50}")
-        
-        try:
-            if test_func():
-                logger.info(f"✓ {test_name} test PASSED")
-                passed += 1
-            else:
-                logger.error(f"✗ {test_name} test FAILED")
-                failed += 1
-        except Exception as e:
-            logger.error(f"✗ {test_name} test FAILED with exception: {e}")
-            failed += 1
-    
-    logger.info(f"\n{'='*50}")
-    logger.info("INTEGRATION TEST RESULTS")
-    logger.info(f"{'='*50}")
-    logger.info(f"Passed: {passed}")
-    logger.info(f"Failed: {failed}")
-    logger.info(f"Total: {passed + failed}")
-    
-    if failed == 0:
-        logger.info("🎉 All tests passed! Integration is working properly.")
-        return 0
-    else:
-        logger.error("❌ Some tests failed. Please check the errors above.")
-        return 1
+        for symbols, result in zip(symbol_lists, results):
+            assert sorted(result) == sorted(s.lower() for s in symbols)
+        logger.info("[OK] Overlapping stock downloads kept their own results")
+    finally:
+        price_scraper.clear_cache()
+
+@requires_components
+@pytest.mark.skipif(os.environ.get("RUN_LIVE_NETWORK_TESTS") != "1",
+                    reason="set RUN_LIVE_NETWORK_TESTS=1 to run live API tests")
+def test_price_scraper_live():
+    """Test price scraper against the real APIs (opt in with RUN_LIVE_NETWORK_TESTS=1)"""
+    logger.info("Testing price scraper against live APIs...")
+    
+    # Test crypto prices (this will make actual API calls)
+    crypto_prices = price_scraper.get_crypto_prices(['bitcoin'])
+    logger.info("[OK] Retrieved %d crypto prices", len(crypto_prices))
+    
+    # Test stock prices (this will make actual API calls)
+    stock_prices = price_scraper.get_stock_prices(['AAPL'])
+    logger.info("[OK] Retrieved %d stock prices", len(stock_prices))
+
+@requires_components
+def test_security_audit(request):
+    """Test security audit functionality"""
+    logger.info("Testing security audit...")
+    
+    results = _cached_audit(getattr(request.config, "cache", None))
+    
+    logger.info("[OK] Security audit completed")
+    logger.info("  - Issues: %d", len(results['issues']))
+    logger.info("  - Warnings: %d", len(results['warnings']))
+    logger.info("  - Recommendations: %d", len(results['recommendations']))
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    # Spread the tests over worker processes when pytest-xdist is installed
+    args = [__file__, "-x"]
+    if importlib.util.find_spec("xdist") is not None:
+        args += ["-n", "auto"]
+    sys.exit(pytest.main(args))